@@ -12,8 +12,18 @@ load_dotenv()
 OLD_DB_CONFIG = {
     'url': os.getenv('OLD_DB_URL', ''),  # Supabase URL remota
     'key': os.getenv('OLD_DB_KEY', ''),  # Supabase service key remota
+    'dsn': os.getenv('OLD_DB_DSN', ''),  # postgresql://... (solo backend 'copy')
 }
 
+# EXTRACT_BACKEND: cómo se leen las tablas de la BD donante
+# - 'rest': Supabase client (PostgREST), paginado
+# - 'copy': conexión Postgres directa con COPY (SELECT ...) TO STDOUT
+EXTRACT_BACKEND = os.getenv('EXTRACT_BACKEND', 'rest').lower()
+
+# EXTRACT_CONSISTENT (solo backend 'copy'): todas las tablas se leen en el mismo
+# instante (REPEATABLE READ + pg_export_snapshot, importado por cada worker)
+EXTRACT_CONSISTENT = os.getenv('EXTRACT_CONSISTENT', 'True').lower() in ('true', '1', 'yes')
+
 # ============================================
 # BASE DE DATOS NUEVA (Guardia Civil)
 # ============================================
@@ -34,6 +44,70 @@ TARGET_SPECIALTY_ID = None  # NULL por defecto
 # Si False, usa datos existentes si están disponibles
 FORCE_DOWNLOAD = os.getenv('FORCE_DOWNLOAD', 'False').lower() in ('true', '1', 'yes')
 
+# VERIFY_SNAPSHOTS: Si True, recalcula el checksum de los snapshots reutilizados
+# Si False, solo se comprueba el sidecar <archivo>.meta y el tamaño del archivo
+VERIFY_SNAPSHOTS = os.getenv('VERIFY_SNAPSHOTS', 'False').lower() in ('true', '1', 'yes')
+
+# Formato de los snapshots (data/ y data/transformed/, ver snapshot.py)
+# - SNAPSHOT_COMPRESSION: 'none' (NDJSON plano) o 'gzip' (cada bloque es un miembro gzip).
+#   Los archivos conservan su nombre .json de DATA_FILES aunque vayan comprimidos,
+#   por eso por defecto se escriben sin comprimir
+# - SNAPSHOT_CHUNK_ROWS: registros por bloque del índice (unidad de lectura parcial/paralela)
+SNAPSHOT_COMPRESSION = os.getenv('SNAPSHOT_COMPRESSION', 'none').lower()
+SNAPSHOT_CHUNK_ROWS = int(os.getenv('SNAPSHOT_CHUNK_ROWS', '50000'))
+
+# PAGINATION_MODE: estrategia de paginación en la extracción
+# - 'keyset': WHERE id > último_id LIMIT n (latencia constante por página)
+# - 'offset': .range(offset, offset + n) (OFFSET en PostgREST, cada página más lenta)
+PAGINATION_MODE = os.getenv('PAGINATION_MODE', 'keyset').lower()
+
+# COUNT_STRATEGY: cómo se estima el total de filas (solo barras de progreso)
+# - 'planned': estimación del planner de Postgres (instantáneo)
+# - 'estimated': max(id) - min(id) + 1 (dos peticiones por índice; tablas con id numérico)
+# - 'exact': COUNT(*) real (lento / timeout en tablas grandes; reservado para validación)
+COUNT_STRATEGY = os.getenv('COUNT_STRATEGY', 'planned').lower()
+
+# DELTA: Si True, las tablas con snapshot y marca de agua previa solo descargan
+# filas nuevas o modificadas (id/updatedAt > marca) y las fusionan con el snapshot
+DELTA_MODE = os.getenv('DELTA', 'False').lower() in ('true', '1', 'yes')
+
+# Columnas de marca de agua por tabla (por defecto el order_by, normalmente 'id')
+DELTA_WATERMARKS = {
+    'users': ['id', 'updatedAt'],
+    'user_tests': ['id', 'updatedAt'],
+    'users_favorite_questions': ['createdAt'],
+}
+
+# Extracción paralela por rangos de id
+EXTRACT_WORKERS = int(os.getenv('EXTRACT_WORKERS', '4'))  # Hilos (un cliente Supabase por hilo)
+EXTRACT_RATE_LIMIT = float(os.getenv('EXTRACT_RATE_LIMIT', '0'))  # Peticiones/segundo (0 = sin límite)
+
+# Extracción concurrente de tablas (extract_all con asyncio): las tablas son
+# lecturas independientes, así las pequeñas no esperan detrás de user_tests
+EXTRACT_CONCURRENT = os.getenv('EXTRACT_CONCURRENT', 'False').lower() in ('true', '1', 'yes')
+EXTRACT_TABLE_CONCURRENCY = int(os.getenv('EXTRACT_TABLE_CONCURRENCY', '3'))  # Tablas simultáneas
+
+# Reintentos de peticiones a la BD donante (ver extract/retry.py)
+RETRY_MAX_ATTEMPTS = int(os.getenv('RETRY_MAX_ATTEMPTS', '6'))  # Intentos por petición
+RETRY_BASE_DELAY = float(os.getenv('RETRY_BASE_DELAY', '1'))  # Segundos, se duplica en cada intento
+RETRY_MAX_DELAY = float(os.getenv('RETRY_MAX_DELAY', '60'))
+CIRCUIT_BREAKER_THRESHOLD = int(os.getenv('CIRCUIT_BREAKER_THRESHOLD', '10'))  # Fallos seguidos que abren el circuito
+CIRCUIT_BREAKER_COOLDOWN = float(os.getenv('CIRCUIT_BREAKER_COOLDOWN', '60'))  # Pausa con el circuito abierto
+CIRCUIT_BREAKER_MAX_OPENS = int(os.getenv('CIRCUIT_BREAKER_MAX_OPENS', '5'))  # Aperturas seguidas antes de abortar
+
+# Tamaño de página adaptativo: BATCH_SIZE es el tamaño inicial y se ajusta
+# según la latencia de cada página (objetivo PAGE_TARGET_SECONDS) y los timeouts
+ADAPTIVE_PAGE_SIZE = os.getenv('ADAPTIVE_PAGE_SIZE', 'True').lower() in ('true', '1', 'yes')
+PAGE_SIZE_MIN = int(os.getenv('PAGE_SIZE_MIN', '100'))
+PAGE_SIZE_MAX = int(os.getenv('PAGE_SIZE_MAX', '5000'))
+PAGE_TARGET_SECONDS = float(os.getenv('PAGE_TARGET_SECONDS', '2'))
+
+# Claves compuestas para paginación keyset en tablas sin id único
+# El primer campo debe coincidir con el order_by de la tabla
+KEYSET_KEYS = {
+    'users_favorite_questions': ['userId', 'questionId'],
+}
+
 # ============================================
 # TOPIC_TYPES CONFIGURATION
 # ============================================
@@ -92,6 +166,25 @@ DATA_DIR = 'data'
 TRANSFORMED_DIR = 'data/transformed'
 LOG_DIR = 'logs'
 
+# Transform de user_test_answers con memoria acotada (transform_user_test_answers.py)
+# 0 = todo en memoria; N = presupuesto en MB: las respuestas se reparten en
+# particiones por user_test_id en SPILL_DIR y cada partición se procesa por separado
+TRANSFORM_MEMORY_MB = int(os.getenv('TRANSFORM_MEMORY_MB', '0'))
+SPILL_DIR = f'{TRANSFORMED_DIR}/spill'
+TRANSFORM_WORKERS = int(os.getenv('TRANSFORM_WORKERS', '1'))  # Procesos del transform de user_test_answers
+TRANSFORM_VECTORIZED = os.getenv('TRANSFORM_VECTORIZED', 'False').lower() in ('true', '1', 'yes')  # Transform por columnas (numpy)
+TRANSFORM_OUTPUT_FORMAT = os.getenv('TRANSFORM_OUTPUT_FORMAT', 'json').lower()  # json o copy (archivos para COPY FROM STDIN)
+
+# Id de los user_tests en la BD destino: USER_TEST_ID_OFFSET + id antiguo.
+# Se asigna en el transform (user_tests y user_test_answers ya llevan el id
+# final); 0 = conservar los ids antiguos. La carga se niega a insertar si el
+# bloque no queda entero por encima de MAX(id) de la BD destino y, si queda,
+# lo reserva adelantando la secuencia (load_user_tests_and_answers.py)
+USER_TEST_ID_OFFSET = int(os.getenv('USER_TEST_ID_OFFSET', '0'))
+
+# Índice de ids de la BD destino que escriben las cargas y leen los transforms (ver id_index.py)
+ID_INDEX_FILE = f'{TRANSFORMED_DIR}/id_index.bin'
+
 DATA_FILES = {
     'categories': f'{DATA_DIR}/categories.json',
     'topics': f'{DATA_DIR}/topics.json',
@@ -104,6 +197,85 @@ DATA_FILES = {
     'flashcards': f'{DATA_DIR}/flashcards.json',
     'cms_users': f'{DATA_DIR}/cms_users.json',
     'challenges': f'{DATA_DIR}/challenges.json',
+    'academies': f'{DATA_DIR}/academies.json',
+}
+
+# ============================================
+# REGISTRO DE TABLAS DE LA BD DONANTE
+# ============================================
+# Una entrada por tabla (ver extract/scheduler.py, que las extrae todas):
+# - table: tabla en la BD donante
+# - output: snapshot de salida
+# - order_by: clave de orden / paginación keyset
+# - columns: proyección (solo los campos que leen los transforms/loads; sin
+#   'columns' se extrae completa). Se añaden siempre las columnas de
+#   KEYSET_KEYS y DELTA_WATERMARKS; las que no existan en la BD donante se
+#   descartan con un aviso. Override: extract_data.py --columns tabla=a,b (o tabla=*)
+# - partition: {'column', 'output', 'shards'} → rangos de id en paralelo, un
+#   archivo por rango (solo el scheduler; extract_all usa 'output')
+# - depends_on: tablas que el scheduler termina antes de empezar esta (FK)
+# - group: 'core' (extract_all), 'flashcards', 'cms', 'academies'
+# - required: si False, un fallo se avisa pero no hace fallar la extracción
+EXTRACT_REGISTRY = [
+    {'table': 'categories', 'output': DATA_FILES['categories'], 'order_by': 'id', 'group': 'core'},
+    {'table': 'topics', 'output': DATA_FILES['topics'], 'order_by': 'id', 'group': 'core'},
+    {
+        'table': 'questions', 'output': DATA_FILES['questions'], 'order_by': 'id', 'group': 'core',
+        'columns': [
+            'id', 'question', 'tip', 'topic', 'article', 'retro_audio', 'retro_text',
+            'publised', 'shuffled', 'num_answered', 'num_fails', 'num_empty',
+            'challenge_by_tutor', 'challenge_reason',
+            'answer1', 'answer2', 'answer3', 'answer4', 'solution',
+        ],
+        'depends_on': ['topics'],
+    },
+    {'table': 'users', 'output': DATA_FILES['users'], 'order_by': 'id', 'group': 'core'},
+    {
+        'table': 'user_tests', 'output': DATA_FILES['user_tests'], 'order_by': 'id', 'group': 'core',
+        'columns': [
+            # 'questions' (array) es necesario para question_count y question_order
+            'id', 'userId', 'topics', 'questions', 'options', 'rightQuestions', 'wrongQuestions',
+            'score', 'finalized', 'visible', 'studyMode', 'studyFailed', 'studyWhite',
+            'isMock', 'isSurvival', 'markCollection', 'minutes', 'timeSpentMillis',
+            'specialTopic', 'specialTopicTitle', 'difficulty_end', 'number_of_lives', 'updatedAt',
+        ],
+        'depends_on': ['users'],
+    },
+    {
+        'table': 'user_test_answers', 'output': DATA_FILES['user_test_answers'], 'order_by': 'id',
+        'group': 'core',
+        'columns': ['id', 'userTestId', 'question', 'answer', 'challenge_by_tutor'],
+        'partition': {'column': 'id', 'output': f'{DATA_DIR}/user_test_answers_{{part:03d}}.json', 'shards': None},
+        'depends_on': ['user_tests', 'questions'],
+    },
+    {
+        'table': 'users_favorite_questions', 'output': DATA_FILES['user_favorite_questions'],
+        'order_by': 'userId', 'group': 'core',
+        'columns': ['userId', 'questionId', 'createdAt'],
+        'depends_on': ['users', 'questions'],
+    },
+    {'table': 'flash_cards_stack', 'output': DATA_FILES['flash_cards_stack'], 'order_by': 'id',
+     'group': 'flashcards', 'required': False},
+    {'table': 'flashcard', 'output': DATA_FILES['flashcards'], 'order_by': 'id',
+     'group': 'flashcards', 'required': False, 'depends_on': ['flash_cards_stack']},
+    {'table': 'cms_users', 'output': DATA_FILES['cms_users'], 'order_by': 'id',
+     'group': 'cms', 'required': False},
+    {'table': 'challenge', 'output': DATA_FILES['challenges'], 'order_by': 'id',
+     'group': 'cms', 'required': False, 'depends_on': ['cms_users']},
+    {'table': 'academy', 'output': DATA_FILES['academies'], 'order_by': 'id',
+     'group': 'academies', 'required': False},
+]
+
+# Tablas de extract_all en orden: (tabla en BD donante, archivo de salida, order_by)
+EXTRACT_TABLES = [
+    (entry['table'], entry['output'], entry['order_by'])
+    for entry in EXTRACT_REGISTRY if entry['group'] == 'core'
+]
+
+# Columnas a extraer por tabla (proyección en lugar de select('*')); las tablas
+# que no aparecen se extraen completas
+EXTRACT_COLUMNS = {
+    entry['table']: entry['columns'] for entry in EXTRACT_REGISTRY if 'columns' in entry
 }
 
 TRANSFORMED_FILES = {
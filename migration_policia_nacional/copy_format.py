@@ -0,0 +1,127 @@
+"""
+Archivos en formato COPY de PostgreSQL (FORMAT TEXT) listos para cargar
+
+La transformación puede escribir directamente las filas con las columnas de
+la tabla destino (separadas por tabuladores, NULL como \\N); la carga envía
+el archivo tal cual a COPY ... FROM STDIN, sin parsear JSON ni formatear
+cada fila en Python.
+
+- CopyWriter: mismo uso que SnapshotWriter (escritura atómica, sidecar .meta
+  con registros, bytes, sha256 y columnas)
+- copy_file: enviar un archivo a COPY FROM STDIN en bloques
+"""
+import hashlib
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from snapshot import write_snapshot_meta, read_snapshot_meta
+
+COPY_NULL = '\\N'
+COPY_BUFFER_BYTES = 1024 * 1024  # Bloque leído y enviado por COPY FROM STDIN
+COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def copy_value(value):
+    """Valor en formato COPY TEXT"""
+    if value is None:
+        return COPY_NULL
+    if value is True:
+        return 't'
+    if value is False:
+        return 'f'
+    if isinstance(value, int):
+        return str(value)
+    return str(value).translate(COPY_ESCAPES)
+
+
+class CopyWriter:
+    """
+    Escritor de un archivo COPY TEXT con escritura atómica
+
+    Uso:
+        with CopyWriter('data/transformed/x.copy', ['id', 'name']) as writer:
+            writer.write_rows(rows)  # dicts con esas claves
+    """
+
+    def __init__(self, filepath, columns, convert=None):
+        self.filepath = filepath
+        self.tmp_path = f"{filepath}.tmp"
+        self.columns = list(columns)
+        # Conversión por columna (por defecto copy_value)
+        self.convert = [(convert or {}).get(column, copy_value) for column in self.columns]
+        self.count = 0
+        self.bytes = 0
+        self.sha256 = hashlib.sha256()
+        self.file = None
+
+    def open(self):
+        directory = os.path.dirname(self.filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(self.tmp_path, 'wb')
+        return self
+
+    def write_rows(self, rows):
+        if not rows:
+            return
+        data = ''.join(
+            '\t'.join([convert(row[column]) for column, convert in zip(self.columns, self.convert)]) + '\n'
+            for row in rows
+        ).encode('utf-8')
+        self.write_data(data, len(rows))
+
+    def write_lines(self, lines):
+        """Añadir filas ya en formato COPY TEXT (bytes con su salto de línea)"""
+        self.write_data(b''.join(lines), len(lines))
+
+    def write_data(self, data, rows):
+        self.file.write(data)
+        self.sha256.update(data)
+        self.bytes += len(data)
+        self.count += rows
+
+    def close(self):
+        self.file.close()
+        os.replace(self.tmp_path, self.filepath)
+        write_snapshot_meta(
+            self.filepath, self.count, self.bytes, self.sha256.hexdigest(),
+            format='copy', columns=self.columns
+        )
+
+    def abort(self):
+        if self.file is not None:
+            self.file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+def copy_file(cur, filepath, table, columns=None):
+    """
+    Cargar un archivo COPY TEXT en una tabla con COPY ... FROM STDIN
+
+    Args:
+        columns: Columnas del archivo (por defecto las de su sidecar)
+
+    Returns:
+        int: Registros cargados (según el sidecar o, sin él, los que informa COPY)
+    """
+    meta = read_snapshot_meta(filepath)
+    columns = columns or (meta or {}).get('columns')
+    column_list = f" ({', '.join(columns)})" if columns else ''
+    with open(filepath, 'rb') as f:
+        cur.copy_expert(
+            f"COPY {table}{column_list} FROM STDIN WITH (FORMAT TEXT, NULL '\\N')",
+            f, size=COPY_BUFFER_BYTES
+        )
+    return meta['rows'] if meta else cur.rowcount
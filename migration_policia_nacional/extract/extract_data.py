@@ -1,20 +1,91 @@
 """
 Extrae datos de la base de datos antigua REMOTA (Policía Nacional - Producción)
-Usa Supabase client con paginación de 500 registros por lote
+Usa Supabase client con paginación adaptativa (BATCH_SIZE registros iniciales por lote)
+Cada tabla se guarda como snapshot NDJSON (ver snapshot.py)
 """
-import json
 from supabase import create_client, Client
 from tqdm import tqdm
 import sys
 import os
+import threading
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Añadir el directorio padre al path para importar config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config import OLD_DB_CONFIG, DATA_FILES, BATCH_SIZE, FORCE_DOWNLOAD
+from config import (
+    OLD_DB_CONFIG, BATCH_SIZE, FORCE_DOWNLOAD,
+    PAGINATION_MODE, KEYSET_KEYS, EXTRACT_WORKERS, EXTRACT_RATE_LIMIT,
+    DELTA_MODE, DELTA_WATERMARKS, EXTRACT_TABLES, EXTRACT_BACKEND, EXTRACT_COLUMNS,
+    COUNT_STRATEGY, EXTRACT_CONCURRENT, VERIFY_SNAPSHOTS
+)
+from extract.rate_limit import RateLimiter
+from extract.page_size import PageSizeController
+from extract.metrics import RunMetrics
+from extract.retry import RequestExecutor
+from extract.manifest import ExtractionManifest
+from snapshot import SnapshotWriter, iter_snapshot, check_snapshot
+
+def count_rows(client, table_name, strategy=None, column='id'):
+    """
+    Estimar el número de filas de una tabla según COUNT_STRATEGY
+
+    El resultado solo se usa para barras de progreso y planificación: la
+    extracción nunca se corta por él. El COUNT exacto queda para validación.
+
+    Args:
+        client: Cliente Supabase
+        table_name: Nombre de la tabla
+        strategy: 'planned', 'estimated' o 'exact' (por defecto COUNT_STRATEGY)
+        column: Columna numérica única para 'estimated'
+
+    Returns:
+        int: Filas estimadas (0 si no se pudo estimar)
+    """
+    strategy = strategy or COUNT_STRATEGY
+    if strategy not in ('planned', 'estimated', 'exact'):
+        raise ValueError(f"COUNT_STRATEGY inválido: {strategy}")
+
+    try:
+        if strategy == 'estimated' and column == 'id':
+            bounds = []
+            for desc in (False, True):
+                response = client.table(table_name).select(column).order(column, desc=desc).limit(1).execute()
+                if not response.data:
+                    return 0
+                bounds.append(response.data[0][column])
+            return bounds[1] - bounds[0] + 1
+
+        # 'estimated' sin id numérico usa la estimación del planner
+        count = 'exact' if strategy == 'exact' else 'planned'
+        response = client.table(table_name).select('*', count=count).limit(1).execute()
+        return response.count or 0
+
+    except Exception as e:
+        print(f"   ⚠️ Error contando registros en {table_name}: {e}")
+        return 0
+
+def filter_value(value):
+    """
+    Valor de una expresión .or_() de PostgREST entre comillas
+
+    Sin comillas, un ',', '.', ':' o paréntesis dentro del valor (textos,
+    timestamps) rompe la expresión o filtra otras filas; dentro de las
+    comillas se escapan '\\' y '"'.
+    """
+    escaped = str(value).replace('\\', '\\\\').replace('"', '\\"')
+    return f'"{escaped}"'
 
 class OldDBExtractor:
     def __init__(self):
         self.client: Client = None
+        self.worker_state = threading.local()  # Un cliente Supabase por hilo
+        self.columns = dict(EXTRACT_COLUMNS)  # tabla -> [columnas] o '*'
+        self.resolved_selects = {}  # tabla -> cláusula select validada
+        self.metrics = RunMetrics()  # Informe por tabla (data/extract_metrics.json)
+        self.requests = RequestExecutor()  # Reintentos/circuit breaker compartidos por todos los hilos
+        self.limiter = None  # RateLimiter global opcional (lo fija el scheduler para todas las tablas)
 
     def connect(self):
         """Conectar a Supabase remota (producción)"""
@@ -40,25 +111,256 @@ class OldDBExtractor:
         """Cerrar conexión (no necesario en Supabase client, pero mantener compatibilidad)"""
         print("✓ Conexión cerrada")
 
-    def get_total_count(self, table_name):
+    def current_client(self):
+        """Cliente Supabase del hilo actual (el propio en hilos de extracción, si no self.client)"""
+        return getattr(self.worker_state, 'client', None) or self.client
+
+    def get_total_count(self, table_name, strategy=None, column='id'):
         """
-        Obtener total de registros en una tabla usando Supabase
+        Obtener total (estimado) de registros en una tabla usando Supabase
 
         Args:
             table_name: Nombre de la tabla
+            strategy: 'planned', 'estimated' o 'exact' (por defecto COUNT_STRATEGY)
+            column: Columna de orden de la tabla
 
         Returns:
-            int: Total de registros
+            int: Total de registros según la estrategia
         """
+        return count_rows(self.current_client(), table_name, strategy, column)
+
+    def is_missing_column_error(self, error):
+        """Error de PostgREST por columna inexistente (42703)"""
+        message = str(error)
+        return '42703' in message or 'does not exist' in message
+
+    def get_select(self, table_name):
+        """
+        Cláusula select para una tabla según EXTRACT_COLUMNS / --columns
+
+        La primera vez se valida con una petición limit(1); si alguna columna
+        no existe en la BD donante se descarta (avisando) en lugar de fallar.
+        """
+        if table_name in self.resolved_selects:
+            return self.resolved_selects[table_name]
+
+        columns = self.columns.get(table_name, '*')
+        if columns == '*' or columns == ['*']:
+            self.resolved_selects[table_name] = '*'
+            return '*'
+
+        required = KEYSET_KEYS.get(table_name, []) + DELTA_WATERMARKS.get(table_name, [])
+        columns = list(dict.fromkeys(list(columns) + required))
+
         try:
-            # Usar count='exact' para obtener el total
-            response = self.client.table(table_name).select('*', count='exact').limit(1).execute()
-            return response.count if hasattr(response, 'count') else 0
+            self.current_client().table(table_name).select(','.join(columns)).limit(1).execute()
         except Exception as e:
-            print(f"   ⚠️ Error contando registros en {table_name}: {e}")
-            return 0
+            if not self.is_missing_column_error(e):
+                raise
+            existing = []
+            for column in columns:
+                try:
+                    self.current_client().table(table_name).select(column).limit(1).execute()
+                    existing.append(column)
+                except Exception as column_error:
+                    if not self.is_missing_column_error(column_error):
+                        raise
+            missing = [column for column in columns if column not in existing]
+            print(f"   ⚠️ Columnas inexistentes en {table_name}, se omiten: {', '.join(missing)}")
+            columns = existing or ['*']
+
+        select = ','.join(columns)
+        self.resolved_selects[table_name] = select
+        print(f"   Columnas: {'todas' if select == '*' else f'{len(columns)} ({select})'}")
+        return select
+
+    def build_keyset_filter(self, key_columns, last_key):
+        """
+        Construir el filtro PostgREST "fila > última clave vista"
+
+        Para una clave compuesta (a, b) genera (valores con filter_value):
+            a.gt."X",and(a.eq."X",b.gt."Y")
+
+        Args:
+            key_columns: Columnas de la clave en orden
+            last_key: Valores de la última fila extraída (mismo orden)
+
+        Returns:
+            str: Expresión para .or_()
+        """
+        conditions = []
+        for i, column in enumerate(key_columns):
+            equals = [f"{key_columns[j]}.eq.{filter_value(last_key[j])}" for j in range(i)]
+            greater = f"{column}.gt.{filter_value(last_key[i])}"
+            if equals:
+                conditions.append(f"and({','.join(equals + [greater])})")
+            else:
+                conditions.append(greater)
+        return ','.join(conditions)
+
+    def fetch_adaptive(self, page_size, fetch_page, limiter=None):
+        """
+        Pedir una página con tamaño adaptativo, reintentando los errores transitorios
+
+        El token del limitador se pide en cada petición real, no una vez por
+        página: los reintentos (RequestExecutor) y las páginas reducidas tras un
+        timeout (PageSizeController) también cuentan para el límite.
+
+        Args:
+            limiter: RateLimiter a usar (por defecto el global del scheduler)
+        """
+        limiter = limiter or self.limiter
+        if limiter is None:
+            return self.requests.call(page_size.fetch, fetch_page)
+
+        def limited_fetch(limit):
+            limiter.acquire()
+            return fetch_page(limit)
+
+        return self.requests.call(page_size.fetch, limited_fetch)
+
+    def fetch_page_offset(self, table_name, order_by, offset, limit):
+        """Obtener una página con OFFSET (.range)"""
+        # range() usa límites inclusivos: range(0, 499) devuelve 500 registros
+        response = self.current_client().table(table_name)\
+            .select(self.get_select(table_name))\
+            .order(order_by)\
+            .range(offset, offset + limit - 1)\
+            .execute()
+        return response.data if hasattr(response, 'data') else []
+
+    def fetch_page_keyset(self, table_name, key_columns, last_key, limit,
+                          client=None, lower_bound=None, upper_bound=None,
+                          query_filter=None):
+        """
+        Obtener una página con keyset: WHERE clave > last_key ORDER BY clave LIMIT n
 
-    def extract_table_paginated(self, table_name, output_file, order_by='id'):
+        Args:
+            table_name: Nombre de la tabla
+            key_columns: Columnas de la clave (la primera es el order_by)
+            last_key: Tupla con la última clave vista, o None para la primera página
+            limit: Registros por página
+            client: Cliente Supabase a usar (por defecto el del hilo actual)
+            lower_bound: Límite inferior inclusivo sobre key_columns[0]
+            upper_bound: Límite superior inclusivo sobre key_columns[0]
+            query_filter: Función query -> query con filtros adicionales
+        """
+        query = (client or self.current_client()).table(table_name).select(self.get_select(table_name))
+
+        if query_filter is not None:
+            query = query_filter(query)
+
+        if lower_bound is not None:
+            query = query.gte(key_columns[0], lower_bound)
+        if upper_bound is not None:
+            query = query.lte(key_columns[0], upper_bound)
+
+        if last_key is not None:
+            if len(key_columns) == 1:
+                query = query.gt(key_columns[0], last_key[0])
+            else:
+                query = query.or_(self.build_keyset_filter(key_columns, last_key))
+
+        for column in key_columns:
+            query = query.order(column)
+
+        response = query.limit(limit).execute()
+        return response.data if hasattr(response, 'data') else []
+
+    def update_watermark(self, watermark, rows, columns):
+        """
+        Actualizar la marca de agua con el máximo de cada columna en rows
+
+        Los timestamps ISO de PostgREST se comparan como texto (mismo formato).
+        """
+        watermark = dict(watermark or {})
+        for column in columns:
+            values = [row[column] for row in rows if row.get(column) is not None]
+            if values:
+                current = watermark.get(column)
+                candidate = max(values)
+                watermark[column] = candidate if current is None else max(current, candidate)
+        return watermark
+
+    def build_watermark_filter(self, watermark):
+        """
+        Filtro "fila nueva o modificada": alguna columna > su marca de agua
+
+        Returns:
+            Función query -> query para fetch_page_keyset
+        """
+        conditions = [(column, value) for column, value in watermark.items() if value is not None]
+
+        def apply(query):
+            if len(conditions) == 1:
+                column, value = conditions[0]
+                return query.gt(column, value)
+            # Valores entre comillas: los timestamps llevan ':' y '+'
+            return query.or_(','.join(f'{column}.gt.{filter_value(value)}' for column, value in conditions))
+
+        return apply
+
+    def extract_table_delta(self, table_name, output_file, key_columns, manifest,
+                            progress_position=None):
+        """
+        Extraer solo filas nuevas o modificadas desde la última marca de agua
+        y fusionarlas con el snapshot existente
+
+        Las filas modificadas sustituyen a la versión anterior (misma clave) y
+        las nuevas se añaden al final. La fusión lee el snapshot en streaming:
+        solo el delta se mantiene en memoria.
+        """
+        watermark = manifest.watermark
+        columns = list(watermark.keys())
+        print(f"   ℹ️ Modo DELTA desde marca de agua: {watermark}")
+        self.get_select(table_name)
+
+        delta = {}
+        last_key = None
+        query_filter = self.build_watermark_filter(watermark)
+        page_size = PageSizeController()
+
+        with tqdm(desc=f"   Delta {table_name}", unit="reg", position=progress_position) as pbar:
+            while True:
+                batch = self.fetch_adaptive(page_size, lambda limit: self.fetch_page_keyset(
+                    table_name, key_columns, last_key, limit,
+                    query_filter=query_filter
+                ))
+                if not batch:
+                    break
+                for row in batch:
+                    delta[tuple(row[column] for column in key_columns)] = row
+                last_key = tuple(batch[-1][column] for column in key_columns)
+                pbar.update(len(batch))
+
+        self.metrics.record(table_name, mode='delta', delta_rows=len(delta), **page_size.summary())
+
+        if not delta:
+            print(f"   ✓ Sin cambios desde la última extracción")
+            return
+
+        new_watermark = self.update_watermark(watermark, list(delta.values()), columns)
+
+        updated = 0
+        with SnapshotWriter(output_file) as writer:
+            for row in iter_snapshot(output_file):
+                key = tuple(row[column] for column in key_columns)
+                if key in delta:
+                    row = delta.pop(key)
+                    updated += 1
+                writer.write_rows([row])
+            # Filas nuevas, en orden de clave
+            inserted = len(delta)
+            writer.write_rows([delta[key] for key in sorted(delta)])
+
+        manifest.set_watermark(new_watermark)
+
+        print(f"   ✓ {updated:,} registros actualizados, {inserted:,} nuevos")
+        print(f"   ✓ Snapshot fusionado: {writer.count:,} registros en {output_file}")
+
+    def extract_table_paginated(self, table_name, output_file, order_by='id',
+                                pagination=None, key_columns=None, delta=None,
+                                progress_position=None):
         """
         Extrae datos de una tabla de forma paginada usando Supabase client
 
@@ -66,77 +368,323 @@ class OldDBExtractor:
             table_name: Nombre de la tabla
             output_file: Archivo de salida JSON
             order_by: Campo para ordenar (importante para paginación consistente)
+            pagination: 'keyset' u 'offset' (por defecto PAGINATION_MODE)
+            key_columns: Clave para keyset; por defecto KEYSET_KEYS[table] o [order_by]
+            delta: Extraer solo cambios desde la marca de agua (por defecto DELTA_MODE)
+            progress_position: Línea de la barra de progreso (extracción concurrente)
         """
         print(f"\n📊 Extrayendo tabla: {table_name}")
 
-        # Verificar si el archivo ya existe y no forzamos descarga
-        if os.path.exists(output_file) and not FORCE_DOWNLOAD:
-            try:
-                with open(output_file, 'r', encoding='utf-8') as f:
-                    existing_data = json.load(f)
-                    print(f"   ✓ Datos ya existentes: {len(existing_data):,} registros")
-                    print(f"   ℹ️ Usando datos guardados (FORCE_DOWNLOAD=False)")
-                    return
-            except (json.JSONDecodeError, IOError):
-                print(f"   ⚠️ Archivo corrupto, re-extrayendo...")
-                # Si el archivo está corrupto, continuar con la extracción
-
-        # Obtener total de registros
-        total = self.get_total_count(table_name)
-        print(f"   Total de registros: {total:,}")
-
-        if total == 0:
-            print(f"   ⚠️ Tabla vacía, saltando...")
-            # Crear archivo vacío
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump([], f)
+        delta = DELTA_MODE if delta is None else delta
+        manifest = ExtractionManifest.load(table_name)
+        watermark_columns = DELTA_WATERMARKS.get(table_name, [order_by])
+
+        pagination = pagination or PAGINATION_MODE
+        if pagination not in ('keyset', 'offset'):
+            raise ValueError(f"PAGINATION_MODE inválido: {pagination}")
+
+        if key_columns is None:
+            key_columns = KEYSET_KEYS.get(table_name, [order_by])
+        if key_columns[0] != order_by:
+            raise ValueError(f"La clave keyset de {table_name} debe empezar por {order_by}")
+
+        # Extracción incremental sobre el snapshot existente
+        if delta and not FORCE_DOWNLOAD and os.path.exists(output_file) and manifest.watermark:
+            self.extract_table_delta(table_name, output_file, key_columns, manifest, progress_position)
             return
 
-        # Extraer datos en lotes
-        all_data = []
+        # Verificar si el archivo ya existe y no forzamos descarga
+        if os.path.exists(output_file) and not FORCE_DOWNLOAD:
+            meta = check_snapshot(output_file, deep=VERIFY_SNAPSHOTS)
+            if meta:
+                print(f"   ✓ Datos ya existentes: {meta['rows']:,} registros ({meta.get('extracted_at', '-')})")
+                print(f"   ℹ️ Usando datos guardados (FORCE_DOWNLOAD=False)")
+                return
+            print(f"   ⚠️ Archivo corrupto, re-extrayendo...")
+            # Si el archivo está corrupto, continuar con la extracción
+
+        # Estimar total de registros (solo para la barra de progreso)
+        total = self.get_total_count(table_name, column=order_by)
+        print(f"   Total de registros (~{COUNT_STRATEGY}): {total:,}")
+
+        print(f"   Paginación: {pagination} ({', '.join(key_columns) if pagination == 'keyset' else order_by})")
+        self.get_select(table_name)
+
+        # Extraer datos en lotes, escribiendo cada página al snapshot según llega
         offset = 0
-
-        with tqdm(total=total, desc=f"   Extrayendo {table_name}", unit="reg") as pbar:
-            while offset < total:
+        last_key = None
+        watermark = None
+        page_size = PageSizeController()
+        start = time.monotonic()
+
+        with SnapshotWriter(output_file) as writer, \
+                tqdm(total=total or None, desc=f"   Extrayendo {table_name}", unit="reg",
+                     position=progress_position) as pbar:
+            while True:
                 try:
                     # Consulta con paginación usando Supabase
-                    # range() usa límites inclusivos: range(0, 499) devuelve 500 registros
-                    end_offset = offset + BATCH_SIZE - 1
-
-                    response = self.client.table(table_name)\
-                        .select('*')\
-                        .order(order_by)\
-                        .range(offset, end_offset)\
-                        .execute()
-
-                    batch = response.data if hasattr(response, 'data') else []
+                    if pagination == 'keyset':
+                        batch = self.fetch_adaptive(page_size, lambda limit: self.fetch_page_keyset(
+                            table_name, key_columns, last_key, limit
+                        ))
+                    else:
+                        batch = self.fetch_adaptive(page_size, lambda limit: self.fetch_page_offset(
+                            table_name, order_by, offset, limit
+                        ))
 
                     if not batch:
                         break
 
                     # Los datos ya vienen como dicts desde Supabase
-                    all_data.extend(batch)
+                    writer.write_rows(batch)
+                    watermark = self.update_watermark(watermark, batch, watermark_columns)
 
                     offset += len(batch)
+                    last_key = tuple(batch[-1][column] for column in key_columns)
                     pbar.update(len(batch))
 
-                    # Si recibimos menos datos de los esperados, hemos terminado
-                    if len(batch) < BATCH_SIZE:
-                        break
+                    # Sin cortar en páginas cortas: con tamaño variable (o el
+                    # max-rows de PostgREST) solo la página vacía marca el final
 
                 except Exception as e:
-                    print(f"\n   ✗ Error en lote offset={offset}: {e}")
+                    position = f"clave>{last_key}" if pagination == 'keyset' else f"offset={offset}"
+                    print(f"\n   ✗ Error en lote {position}: {e}")
                     raise
 
-        # Guardar en archivo JSON
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(all_data, f, ensure_ascii=False, indent=2)
+        manifest.set_watermark(watermark)
+        self.record_table_metrics(table_name, writer.count, time.monotonic() - start, page_size)
 
+        if writer.count == 0:
+            print(f"   ⚠️ Tabla vacía")
         print(f"   ✓ Guardado en {output_file}")
-        print(f"   ✓ {len(all_data):,} registros extraídos")
+        print(f"   ✓ {writer.count:,} registros extraídos")
+
+    def record_table_metrics(self, table_name, rows, seconds, page_size):
+        """Registrar filas, tiempo y tamaño de página elegido de una tabla"""
+        self.metrics.record(
+            table_name,
+            rows=rows,
+            seconds=round(seconds, 2),
+            rows_per_second=round(rows / seconds) if seconds > 0 else None,
+            **page_size.summary()
+        )
+
+    def begin_snapshot(self):
+        """
+        PostgREST no permite fijar un instante de lectura común a varias
+        peticiones: cada página ve los datos de su momento (ver
+        PostgresCopyExtractor.begin_snapshot)
+        """
+
+    def end_snapshot(self):
+        """Sin snapshot que liberar"""
+
+    def save_metrics(self):
+        """Guardar el informe de la ejecución con los contadores de peticiones"""
+        self.metrics.record('_requests', **self.requests.summary())
+        self.metrics.save()
+
+    def create_worker_client(self):
+        """Crear un cliente Supabase independiente para un hilo de extracción"""
+        return create_client(OLD_DB_CONFIG['url'], OLD_DB_CONFIG['key'])
+
+    def get_id_bounds(self, table_name, column='id'):
+        """
+        Obtener (min, max) de una columna numérica sin COUNT
+
+        Returns:
+            tuple: (min_id, max_id) o (None, None) si la tabla está vacía
+        """
+        bounds = []
+        for desc in (False, True):
+            query = self.current_client().table(table_name)\
+                .select(column)\
+                .order(column, desc=desc)\
+                .limit(1)
+            response = self.requests.call(query.execute)
+            if not response.data:
+                return None, None
+            bounds.append(response.data[0][column])
+        return bounds[0], bounds[1]
+
+    def extract_id_range(self, table_name, column, id_range, page_size, writer,
+                         limiter=None, pbar=None, pbar_lock=None):
+        """
+        Extraer todas las filas con column en [desde, hasta] usando keyset
+
+        Cada hilo llama a este método con su propio cliente Supabase y
+        escribe cada página en el snapshot de su shard. page_size es el
+        PageSizeController de la tabla, compartido por todos los shards.
+
+        Returns:
+            int: Registros extraídos
+        """
+        local = self.worker_state
+        if not hasattr(local, 'client'):
+            local.client = self.create_worker_client()
+
+        lower, upper = id_range
+        last_key = None
+
+        while True:
+            batch = self.fetch_adaptive(page_size, lambda limit: self.fetch_page_keyset(
+                table_name, [column], last_key, limit,
+                client=local.client, lower_bound=lower, upper_bound=upper
+            ), limiter)
+            if not batch:
+                break
+
+            writer.write_rows(batch)
+            last_key = (batch[-1][column],)
+
+            if pbar is not None:
+                with pbar_lock:
+                    pbar.update(len(batch))
+
+        return writer.count
+
+    def extract_shard(self, table_name, column, part, id_range, output_file, page_size,
+                      manifest, limiter=None, pbar=None, pbar_lock=None):
+        """Extraer un shard a su propio snapshot NDJSON y confirmarlo en el manifest"""
+        with SnapshotWriter(output_file) as writer:
+            self.extract_id_range(
+                table_name, column, id_range, page_size, writer,
+                limiter, pbar, pbar_lock
+            )
+        manifest.commit_part(part, output_file, writer.count, id_range=id_range)
+        return output_file, writer.count
+
+    def plan_shards(self, table_name, column, num_shards, manifest):
+        """Reparto en rangos de la tabla (ver ExtractionManifest.plan_ranges)"""
+        min_id, max_id = self.get_id_bounds(table_name, column)
+        if min_id is None:
+            return []
+        return manifest.plan_ranges(column, min_id, max_id, num_shards)
+
+    def extract_table_sharded(self, table_name, output_pattern, column='id',
+                              num_shards=None, workers=None, rate_limit=None,
+                              batch_size=BATCH_SIZE, manifest=None):
+        """
+        Extraer una tabla dividiendo [min_id, max_id] en rangos paralelos
+
+        Cada rango (shard) se extrae con keyset en un hilo con su propio cliente
+        y se guarda en su propio archivo de salida. Las partes completadas se
+        registran en el manifest de la tabla: al relanzar, solo se descargan
+        los shards que faltan o fallaron.
+
+        Args:
+            table_name: Nombre de la tabla
+            output_pattern: Ruta con {part} para cada shard, ej: data/x_{part:03d}.json
+                (cada archivo es un snapshot NDJSON)
+            column: Columna numérica para dividir (debe ser única y ordenable)
+            num_shards: Número de rangos (por defecto workers * 4)
+            workers: Hilos concurrentes (por defecto EXTRACT_WORKERS)
+            rate_limit: Peticiones/segundo máximas entre todos los hilos (se ignora
+                si el extractor tiene un limitador global)
+            batch_size: Registros por petición iniciales (se adapta con PageSizeController)
+            manifest: ExtractionManifest (por defecto el de la tabla en data/)
+
+        Returns:
+            list: [(archivo, registros), ...] en orden de shard
+        """
+        workers = workers or EXTRACT_WORKERS
+        num_shards = num_shards or workers * 4
+        rate_limit = EXTRACT_RATE_LIMIT if rate_limit is None else rate_limit
+        manifest = manifest or ExtractionManifest.load(table_name)
+
+        print(f"\n📊 Extrayendo tabla en paralelo: {table_name}")
+
+        if FORCE_DOWNLOAD or (manifest.parts and not manifest.plan):
+            # FORCE o el manifest viene del modo secuencial: empezar de cero
+            manifest.reset(remove_files=True)
+
+        ranges = self.plan_shards(table_name, column, num_shards, manifest)
+        if not ranges:
+            print(f"   ⚠️ Tabla vacía, saltando...")
+            return []
+
+        print(f"   Rango de {column}: {ranges[0][0]:,} → {ranges[-1][1]:,}")
+
+        results = {}
+        pending = []
+        for part, id_range in enumerate(ranges, start=1):
+            output_file = output_pattern.format(part=part)
+            if manifest.is_part_complete(part, output_file, id_range):
+                results[part] = (output_file, manifest.parts[str(part)]['rows'])
+            else:
+                pending.append((part, id_range, output_file))
+
+        if results:
+            print(f"   ✓ {len(results)} shards ya completados en el manifest")
+        if not pending:
+            print(f"   ℹ️ Nada pendiente (FORCE_DOWNLOAD=False)")
+            return [results[part] for part in sorted(results)]
+
+        print(f"   {len(pending)} shards pendientes, {workers} workers, "
+              f"límite: {f'{rate_limit} req/s' if rate_limit else 'sin límite'}")
+
+        # Validar la proyección una sola vez antes de lanzar los hilos
+        self.get_select(table_name)
+
+        # Con un limitador global (scheduler) fetch_adaptive ya lo aplica a cada petición
+        limiter = RateLimiter(rate_limit) if self.limiter is None else None
+        page_size = PageSizeController(initial=batch_size)
+        pbar_lock = threading.Lock()
+        start = time.monotonic()
+        failed = []
+        pending_span = sum(hi - lo + 1 for _, (lo, hi), _ in pending)
+
+        with tqdm(total=pending_span, desc=f"   Extrayendo {table_name}", unit="reg") as pbar:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = {
+                    pool.submit(
+                        self.extract_shard, table_name, column, part, id_range,
+                        output_file, page_size, manifest,
+                        limiter, pbar, pbar_lock
+                    ): part
+                    for part, id_range, output_file in pending
+                }
+
+                for future in as_completed(futures):
+                    part = futures[future]
+                    try:
+                        results[part] = future.result()
+                    except Exception as e:
+                        failed.append(part)
+                        print(f"\n   ✗ Error en shard {part}: {str(e)[:200]}")
+
+        total = sum(count for _, count in results.values())
+        print(f"   ✓ {total:,} registros extraídos en {len(results)} archivos")
+
+        extracted = sum(results[part][1] for part, _, _ in pending if part in results)
+        self.record_table_metrics(table_name, extracted, time.monotonic() - start, page_size)
+        self.metrics.record(table_name, mode='sharded', workers=workers, shards=len(ranges))
+
+        if failed:
+            raise RuntimeError(
+                f"{len(failed)} shards fallidos {sorted(failed)}; "
+                f"vuelve a ejecutar para reintentar solo esos rangos"
+            )
+
+        return [results[part] for part in sorted(results)]
+
+    def extract_table_in_worker(self, table_name, output_file, order_by, position):
+        """Extraer una tabla en un hilo del pool con su propio cliente Supabase"""
+        local = self.worker_state
+        if not hasattr(local, 'client'):
+            local.client = self.create_worker_client()
+        self.extract_table_paginated(table_name, output_file, order_by, progress_position=position)
+
+    def extract_all(self, concurrent=None):
+        """
+        Extraer todas las tablas necesarias
+
+        Args:
+            concurrent: Extraer varias tablas a la vez con ExtractionScheduler
+                (por defecto EXTRACT_CONCURRENT)
+        """
+        concurrent = EXTRACT_CONCURRENT if concurrent is None else concurrent
 
-    def extract_all(self):
-        """Extraer todas las tablas necesarias"""
         print("\n" + "="*60)
         print("🚀 EXTRACCIÓN DE DATOS - SUPABASE REMOTA (DONANTE)")
         print("="*60)
@@ -145,33 +693,74 @@ class OldDBExtractor:
             print("⚠️ FORCE_DOWNLOAD = True - Descargando datos nuevos")
         else:
             print("ℹ️ FORCE_DOWNLOAD = False - Usando datos existentes si están disponibles")
+        print(f"ℹ️ PAGINATION_MODE = {PAGINATION_MODE}")
+        if DELTA_MODE:
+            print("ℹ️ DELTA = True - Solo filas nuevas/modificadas sobre los snapshots existentes")
         print("="*60)
 
-        # Tablas a extraer en orden
-        tables_config = [
-            ('categories', DATA_FILES['categories'], 'id'),
-            ('topics', DATA_FILES['topics'], 'id'),
-            ('questions', DATA_FILES['questions'], 'id'),
-            ('users', DATA_FILES['users'], 'id'),
-            ('user_tests', DATA_FILES['user_tests'], 'id'),
-            ('user_test_answers', DATA_FILES['user_test_answers'], 'id'),
-            ('users_favorite_questions', DATA_FILES['user_favorite_questions'], 'userId'),
-        ]
-
-        for table_name, output_file, order_by in tables_config:
+        if concurrent:
+            # El mismo planificador que extract/scheduler.py (depends_on, required y particiones)
+            from extract.scheduler import ExtractionScheduler, select_entries
             try:
-                self.extract_table_paginated(table_name, output_file, order_by)
-            except Exception as e:
-                print(f"   ✗ Error extrayendo {table_name}: {e}")
-                raise
+                ExtractionScheduler(self, select_entries(groups=['core'])).run()
+            finally:
+                self.save_metrics()
+        else:
+            for table_name, output_file, order_by in EXTRACT_TABLES:
+                try:
+                    self.extract_table_paginated(table_name, output_file, order_by)
+                except Exception as e:
+                    print(f"   ✗ Error extrayendo {table_name}: {e}")
+                    raise
+
+            self.save_metrics()
 
         print("\n" + "="*60)
         print("✓ EXTRACCIÓN COMPLETADA")
+        self.metrics.print_summary()
+        print(f"   Métricas guardadas en {self.metrics.path}")
         print("="*60)
 
+def get_extractor(backend=None):
+    """
+    Crear el extractor según EXTRACT_BACKEND
+
+    Args:
+        backend: 'rest' (Supabase client) o 'copy' (Postgres directo)
+    """
+    backend = backend or EXTRACT_BACKEND
+    if backend == 'rest':
+        return OldDBExtractor()
+    if backend == 'copy':
+        from extract.extract_copy import PostgresCopyExtractor
+        return PostgresCopyExtractor()
+    raise ValueError(f"EXTRACT_BACKEND inválido: {backend}")
+
+def parse_columns_overrides(values):
+    """
+    Convertir --columns tabla=a,b,c (repetible) en {tabla: [a, b, c]}
+
+    tabla=* extrae todas las columnas de esa tabla.
+    """
+    overrides = {}
+    for value in values or []:
+        table_name, _, columns = value.partition('=')
+        if not table_name or not columns:
+            raise ValueError(f"--columns debe tener el formato tabla=col1,col2 (recibido: {value})")
+        overrides[table_name] = '*' if columns.strip() == '*' else [c.strip() for c in columns.split(',') if c.strip()]
+    return overrides
+
 def main():
     """Función principal"""
-    extractor = OldDBExtractor()
+    parser = argparse.ArgumentParser(description='Extraer datos de la BD antigua')
+    parser.add_argument('--columns', action='append', metavar='TABLA=COL1,COL2',
+                        help='Columnas a extraer de una tabla (repetible); TABLA=* para todas')
+    parser.add_argument('--concurrent', action='store_true', default=None,
+                        help='Extraer varias tablas a la vez (EXTRACT_CONCURRENT)')
+    args = parser.parse_args()
+
+    extractor = get_extractor()
+    extractor.columns.update(parse_columns_overrides(args.columns))
 
     try:
         # Conectar
@@ -179,7 +768,10 @@ def main():
             return False
 
         # Extraer todas las tablas
-        extractor.extract_all()
+        if args.concurrent:
+            extractor.extract_all(concurrent=True)
+        else:
+            extractor.extract_all()
 
         return True
 
@@ -0,0 +1,192 @@
+"""
+Manifest de checkpoints para extracciones reanudables
+
+Por cada tabla se guarda data/<tabla>.manifest.json con las partes ya
+completadas (archivo, rango, registros, checksum) y el último cursor.
+Al relanzar la extracción solo se descargan las partes que faltan o cuyo
+archivo no coincide con el checksum registrado.
+"""
+import json
+import os
+import sys
+import threading
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import DATA_DIR, VERIFY_SNAPSHOTS
+from snapshot import file_sha256, read_snapshot_meta, meta_path
+
+
+def plan_id_ranges(min_id, max_id, num_shards):
+    """
+    Dividir [min_id, max_id] en num_shards rangos inclusivos contiguos
+
+    Returns:
+        list: [(desde, hasta), ...]
+    """
+    span = max_id - min_id + 1
+    num_shards = max(1, min(num_shards, span))
+    step = (span + num_shards - 1) // num_shards
+
+    ranges = []
+    start = min_id
+    while start <= max_id:
+        end = min(start + step - 1, max_id)
+        ranges.append((start, end))
+        start = end + 1
+    return ranges
+
+
+class ExtractionManifest:
+    def __init__(self, table_name, path=None):
+        self.table_name = table_name
+        self.path = path or f"{DATA_DIR}/{table_name}.manifest.json"
+        self.lock = threading.Lock()
+        self.data = {
+            'table': table_name,
+            'plan': None,     # {'column': 'id', 'ranges': [[desde, hasta], ...]}
+            'cursor': None,   # Último valor de clave confirmado (modo secuencial)
+            'parts': {},      # part -> {file, rows, sha256, bytes, range, cursor, completed_at}
+            'watermark': None,  # {columna: valor máximo extraído} para extracción incremental
+        }
+
+    @classmethod
+    def load(cls, table_name, path=None):
+        """Cargar el manifest de una tabla (vacío si no existe)"""
+        manifest = cls(table_name, path)
+        if os.path.exists(manifest.path):
+            with open(manifest.path, 'r', encoding='utf-8') as f:
+                manifest.data.update(json.load(f))
+        return manifest
+
+    def save(self):
+        """Guardar el manifest de forma atómica"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def reset(self, remove_files=False):
+        """
+        Olvidar todas las partes (extracción desde cero)
+
+        Args:
+            remove_files: Borrar también los archivos registrados, para que no
+                queden partes de una extracción anterior junto a las nuevas
+        """
+        with self.lock:
+            if remove_files:
+                for entry in self.data['parts'].values():
+                    for path in (entry['file'], meta_path(entry['file'])):
+                        if os.path.exists(path):
+                            os.remove(path)
+            self.data['plan'] = None
+            self.data['cursor'] = None
+            self.data['parts'] = {}
+            self.data['watermark'] = None
+            self.save()
+
+    @property
+    def plan(self):
+        return self.data['plan']
+
+    def set_plan(self, column, ranges):
+        """Registrar el reparto en rangos para que sea estable entre reinicios"""
+        with self.lock:
+            self.data['plan'] = {'column': column, 'ranges': [list(r) for r in ranges]}
+            self.save()
+
+    def plan_ranges(self, column, min_id, max_id, num_shards):
+        """
+        Obtener el reparto en rangos, reutilizando el del manifest si existe
+
+        El reparto guardado se mantiene entre reinicios para que las partes ya
+        confirmadas sigan siendo válidas. Si la tabla ha crecido desde entonces,
+        se añade un rango nuevo con los ids posteriores.
+        """
+        plan = self.plan
+        if plan and plan['column'] == column and plan['ranges']:
+            ranges = [tuple(r) for r in plan['ranges']]
+            planned_max = ranges[-1][1]
+            if max_id > planned_max:
+                ranges.append((planned_max + 1, max_id))
+                self.set_plan(column, ranges)
+            print(f"   ℹ️ Reanudando con el reparto del manifest ({len(ranges)} shards)")
+            return ranges
+
+        ranges = plan_id_ranges(min_id, max_id, num_shards)
+        self.set_plan(column, ranges)
+        return ranges
+
+    @property
+    def cursor(self):
+        return self.data['cursor']
+
+    @property
+    def parts(self):
+        return self.data['parts']
+
+    def is_part_complete(self, part, output_file, id_range=None):
+        """
+        Comprobar que una parte está confirmada y su archivo sigue intacto
+
+        Args:
+            part: Número de parte
+            output_file: Archivo esperado
+            id_range: Rango esperado (si la parte es un shard)
+        """
+        entry = self.data['parts'].get(str(part))
+        if not entry or entry['file'] != output_file:
+            return False
+        if id_range is not None and entry.get('range') != list(id_range):
+            return False
+        if not os.path.exists(output_file) or os.path.getsize(output_file) != entry['bytes']:
+            return False
+        if VERIFY_SNAPSHOTS:
+            return file_sha256(output_file) == entry['sha256']
+        # Sin verificación profunda basta con que el sidecar coincida con la parte
+        meta = read_snapshot_meta(output_file)
+        return meta is not None and meta['sha256'] == entry['sha256'] and meta['bytes'] == entry['bytes']
+
+    def commit_part(self, part, output_file, rows, id_range=None, cursor=None):
+        """
+        Confirmar una parte escrita completamente
+
+        Args:
+            part: Número de parte
+            output_file: Archivo del snapshot ya cerrado
+            rows: Registros escritos
+            id_range: Rango del shard (modo paralelo)
+            cursor: Última clave de la parte (modo secuencial)
+        """
+        size = os.path.getsize(output_file)
+        meta = read_snapshot_meta(output_file)
+        entry = {
+            'file': output_file,
+            'rows': rows,
+            'bytes': size,
+            # El sidecar ya trae el checksum calculado al escribir
+            'sha256': meta['sha256'] if meta and meta['bytes'] == size else file_sha256(output_file),
+            'range': list(id_range) if id_range is not None else None,
+            'cursor': cursor,
+            'completed_at': datetime.now().isoformat(),
+        }
+        with self.lock:
+            self.data['parts'][str(part)] = entry
+            if cursor is not None:
+                self.data['cursor'] = cursor
+            self.save()
+
+    @property
+    def watermark(self):
+        return self.data['watermark']
+
+    def set_watermark(self, watermark):
+        """Guardar la marca de agua del último snapshot completo o delta"""
+        with self.lock:
+            self.data['watermark'] = watermark
+            self.save()
+
+    def total_rows(self):
+        return sum(entry['rows'] for entry in self.data['parts'].values())
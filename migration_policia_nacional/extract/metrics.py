@@ -0,0 +1,62 @@
+"""
+Métricas de una ejecución de extracción (por tabla)
+
+Se guardan en data/extract_metrics.json al terminar extract_all para poder
+comparar ejecuciones: tamaño de página elegido, páginas, filas, tiempo...
+"""
+import json
+import os
+import sys
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import DATA_DIR
+
+METRICS_FILE = f"{DATA_DIR}/extract_metrics.json"
+
+
+class RunMetrics:
+    """Métricas por tabla, seguras entre hilos"""
+
+    def __init__(self, path=None):
+        self.path = path or METRICS_FILE
+        self.tables = {}
+        self.lock = threading.Lock()
+
+    def record(self, table_name, **values):
+        """Añadir o actualizar métricas de una tabla"""
+        with self.lock:
+            self.tables.setdefault(table_name, {}).update(values)
+
+    def save(self):
+        """
+        Guardar el informe de forma atómica
+
+        Se fusiona con el archivo existente: las tablas extraídas por otros
+        scripts (o en ejecuciones anteriores) se conservan.
+        """
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tables = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    tables = json.load(f).get('tables', {})
+            except (json.JSONDecodeError, IOError):
+                pass
+
+        tmp_path = f"{self.path}.tmp"
+        with self.lock:
+            tables.update(self.tables)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'tables': tables}, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def print_summary(self):
+        """Resumen por tabla en consola"""
+        with self.lock:
+            for table_name, values in self.tables.items():
+                details = ', '.join(f"{key}={value}" for key, value in values.items() if value is not None)
+                print(f"   {table_name}: {details}")
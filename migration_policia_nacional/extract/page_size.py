@@ -0,0 +1,136 @@
+"""
+Tamaño de página adaptativo para la extracción remota (PostgREST)
+
+En lugar de un BATCH_SIZE fijo, mide la latencia de cada página y los
+errores de timeout y ajusta el tamaño dentro de [PAGE_SIZE_MIN, PAGE_SIZE_MAX]:
+- Página rápida y completa: crece (menos ida y vuelta)
+- Página lenta: se reduce en proporción al exceso sobre PAGE_TARGET_SECONDS
+- Timeout de la BD donante: se reduce a la mitad y se reintenta la página
+"""
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import BATCH_SIZE, ADAPTIVE_PAGE_SIZE, PAGE_SIZE_MIN, PAGE_SIZE_MAX, PAGE_TARGET_SECONDS
+
+GROWTH_FACTOR = 1.5
+
+# Mensajes de error que indican que la página era demasiado grande
+TIMEOUT_MARKERS = ('57014', 'statement timeout', 'timed out', 'timeout')
+
+
+def is_timeout_error(error):
+    """Error de timeout de la consulta (statement_timeout o timeout HTTP)"""
+    message = f"{type(error).__name__} {error}".lower()
+    return any(marker in message for marker in TIMEOUT_MARKERS)
+
+
+class PageSizeController:
+    """
+    Controlador del tamaño de página de una tabla
+
+    Se puede compartir entre los hilos que extraen shards de la misma tabla.
+
+    Uso:
+        controller = PageSizeController()
+        batch = controller.fetch(lambda limit: extractor.fetch_page_keyset(..., limit))
+    """
+
+    def __init__(self, initial=None, min_size=None, max_size=None,
+                 target_seconds=None, adaptive=None):
+        self.min_size = min_size or PAGE_SIZE_MIN
+        self.max_size = max(self.min_size, max_size or PAGE_SIZE_MAX)
+        self.target_seconds = target_seconds or PAGE_TARGET_SECONDS
+        self.adaptive = ADAPTIVE_PAGE_SIZE if adaptive is None else adaptive
+        initial = initial or BATCH_SIZE
+        self.current = initial if not self.adaptive else min(self.max_size, max(self.min_size, initial))
+
+        self.pages = 0
+        self.rows = 0
+        self.seconds = 0.0
+        self.timeouts = 0
+        self.server_cap = None
+        self.local = threading.local()  # Última página corta de cada hilo
+        self.lock = threading.Lock()
+
+    @property
+    def size(self):
+        with self.lock:
+            return self.current
+
+    def record_page(self, requested, rows, seconds):
+        """Registrar una página servida y ajustar el tamaño"""
+        with self.lock:
+            self.pages += 1
+            self.rows += rows
+            self.seconds += seconds
+
+            if not self.adaptive:
+                return
+
+            # Una página corta seguida de otra con datos: el servidor limita las
+            # filas por respuesta (max-rows de PostgREST), no crecer por encima
+            last_short = getattr(self.local, 'last_short', None)
+            if rows and last_short:
+                self.server_cap = min(self.server_cap or last_short, last_short)
+                self.max_size = max(self.min_size, min(self.max_size, self.server_cap))
+                self.current = min(self.current, self.max_size)
+            self.local.last_short = rows if 0 < rows < requested else None
+
+            if seconds > self.target_seconds:
+                self.current = max(self.min_size, int(self.current * self.target_seconds / seconds))
+            elif rows >= requested and seconds < self.target_seconds / 2:
+                self.current = min(self.max_size, int(self.current * GROWTH_FACTOR))
+
+    def record_error(self, error):
+        """
+        Registrar un error de página
+
+        Returns:
+            bool: True si era un timeout y se redujo el tamaño (reintentar la página)
+        """
+        with self.lock:
+            if not self.adaptive or not is_timeout_error(error) or self.current <= self.min_size:
+                return False
+            self.timeouts += 1
+            self.current = max(self.min_size, self.current // 2)
+            # No volver a crecer hasta el tamaño que provocó el timeout
+            self.max_size = self.current
+            return True
+
+    def fetch(self, fetch_page, max_rows=None):
+        """
+        Pedir una página con el tamaño actual
+
+        Args:
+            fetch_page: Función limit -> lista de registros
+            max_rows: Límite adicional de esta petición (ej: lo que falta para cerrar un archivo)
+
+        Returns:
+            list: Registros de la página
+        """
+        while True:
+            requested = self.size if max_rows is None else min(self.size, max_rows)
+            start = time.monotonic()
+            try:
+                batch = fetch_page(requested)
+            except Exception as e:
+                if self.record_error(e):
+                    print(f"\n   ⚠️ Timeout con páginas de {requested:,}, reduciendo a {self.size:,}")
+                    continue
+                raise
+            self.record_page(requested, len(batch), time.monotonic() - start)
+            return batch
+
+    def summary(self):
+        """Métricas para el informe de la ejecución"""
+        with self.lock:
+            return {
+                'page_size': self.current,
+                'pages': self.pages,
+                'page_timeouts': self.timeouts,
+                'server_cap': self.server_cap,
+                'avg_page_seconds': round(self.seconds / self.pages, 3) if self.pages else None,
+            }
@@ -0,0 +1,41 @@
+"""
+Limitador de peticiones compartido entre hilos de extracción
+Evita saturar la BD DONANTE (producción) cuando se extrae en paralelo
+"""
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Token bucket simple: como máximo `requests_per_second` peticiones por segundo
+    sumando todos los hilos que comparten la instancia.
+
+    Con requests_per_second=None (o 0) no limita nada.
+    """
+
+    def __init__(self, requests_per_second=None, burst=1):
+        self.rate = requests_per_second or 0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Bloquear hasta que haya un token disponible"""
+        if not self.rate:
+            return
+
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
@@ -0,0 +1,190 @@
+"""
+Reintentos con backoff exponencial y circuit breaker para las llamadas a la BD donante
+
+Todas las peticiones de extracción (páginas, límites de id...) pasan por un
+RequestExecutor compartido:
+- Solo se reintentan errores transitorios: timeouts, errores de red, HTTP 429/5xx
+  y códigos de Postgres/PostgREST de sobrecarga o conexión
+- Espera exponencial con jitter entre intentos (RETRY_BASE_DELAY * 2^n, máx. RETRY_MAX_DELAY)
+- Tras CIRCUIT_BREAKER_THRESHOLD fallos transitorios seguidos el circuito se abre:
+  todos los hilos pausan CIRCUIT_BREAKER_COOLDOWN segundos antes de volver a probar.
+  Si se abre más de CIRCUIT_BREAKER_MAX_OPENS veces sin una petición correcta, se aborta.
+- Los contadores se guardan en el informe de la ejecución (extract_metrics.json)
+"""
+import os
+import random
+import sys
+import threading
+import time
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    RETRY_MAX_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY,
+    CIRCUIT_BREAKER_THRESHOLD, CIRCUIT_BREAKER_COOLDOWN, CIRCUIT_BREAKER_MAX_OPENS
+)
+
+# SQLSTATE de Postgres y códigos de PostgREST que indican un fallo transitorio
+RETRYABLE_CODES = {
+    '57014',  # statement_timeout / consulta cancelada
+    '57P01', '57P02', '57P03',  # servidor reiniciándose / no acepta conexiones
+    '53300',  # too_many_connections
+    '40001', '40P01',  # serialization_failure / deadlock
+    'PGRST000', 'PGRST001', 'PGRST002', 'PGRST003',  # PostgREST sin conexión a la BD / pool agotado
+}
+
+RETRYABLE_MESSAGES = ('timeout', 'timed out', 'connection reset', 'connection refused',
+                      'temporarily unavailable', 'too many requests', 'bad gateway',
+                      'service unavailable', 'gateway timeout')
+
+
+class CircuitOpenError(RuntimeError):
+    """La BD donante sigue fallando tras varias aperturas del circuito"""
+
+
+def classify_error(error):
+    """
+    Clasificar un error de petición
+
+    Returns:
+        str: Tipo de error transitorio ('timeout', 'network', 'http_429', 'http_5xx', 'db')
+            o None si no se debe reintentar
+    """
+    if isinstance(error, (httpx.TimeoutException, TimeoutError)):
+        return 'timeout'
+    if isinstance(error, (httpx.TransportError, ConnectionError)):
+        return 'network'
+
+    # postgrest.APIError: code es el SQLSTATE/código PostgREST o, si la
+    # respuesta no era JSON (proxy/gateway), el status HTTP
+    code = getattr(error, 'code', None)
+    if code is not None:
+        code = str(code)
+        if code == '429':
+            return 'http_429'
+        if code.isdigit() and len(code) == 3 and code.startswith('5'):
+            return 'http_5xx'
+        if code in RETRYABLE_CODES:
+            return 'timeout' if code == '57014' else 'db'
+        return None
+
+    message = str(error).lower()
+    if any(marker in message for marker in RETRYABLE_MESSAGES):
+        return 'timeout' if 'time' in message else 'network'
+    return None
+
+
+class RequestExecutor:
+    """
+    Ejecutor de peticiones compartido entre hilos
+
+    Uso:
+        executor = RequestExecutor()
+        batch = executor.call(page_size.fetch, lambda limit: ...)
+    """
+
+    def __init__(self, max_attempts=None, base_delay=None, max_delay=None,
+                 breaker_threshold=None, breaker_cooldown=None, breaker_max_opens=None):
+        self.max_attempts = max_attempts or RETRY_MAX_ATTEMPTS
+        self.base_delay = RETRY_BASE_DELAY if base_delay is None else base_delay
+        self.max_delay = RETRY_MAX_DELAY if max_delay is None else max_delay
+        self.breaker_threshold = breaker_threshold or CIRCUIT_BREAKER_THRESHOLD
+        self.breaker_cooldown = CIRCUIT_BREAKER_COOLDOWN if breaker_cooldown is None else breaker_cooldown
+        self.breaker_max_opens = breaker_max_opens or CIRCUIT_BREAKER_MAX_OPENS
+
+        self.lock = threading.Lock()
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.opens_without_success = 0
+
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.circuit_opens = 0
+        self.errors = {}  # tipo de error -> veces
+
+    def backoff(self, attempt):
+        """Espera antes del reintento `attempt` (1, 2, ...): exponencial con jitter completo"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def wait_if_open(self):
+        """Bloquear mientras el circuito esté abierto"""
+        while True:
+            with self.lock:
+                if self.opens_without_success > self.breaker_max_opens:
+                    raise CircuitOpenError(
+                        f"BD donante sin responder tras {self.opens_without_success - 1} pausas "
+                        f"de {self.breaker_cooldown}s; vuelve a ejecutar más tarde"
+                    )
+                wait = self.open_until - time.monotonic()
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    def record_success(self):
+        with self.lock:
+            self.consecutive_failures = 0
+            self.opens_without_success = 0
+
+    def record_failure(self, kind):
+        """Registrar un fallo transitorio y abrir el circuito si se supera el umbral"""
+        with self.lock:
+            self.errors[kind] = self.errors.get(kind, 0) + 1
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= self.breaker_threshold and time.monotonic() >= self.open_until:
+                self.consecutive_failures = 0
+                self.circuit_opens += 1
+                self.opens_without_success += 1
+                self.open_until = time.monotonic() + self.breaker_cooldown
+                if self.opens_without_success <= self.breaker_max_opens:
+                    print(f"\n   ⚠️ Circuito abierto: {self.breaker_threshold} fallos seguidos, "
+                          f"pausa de {self.breaker_cooldown}s")
+
+    def call(self, fn, *args, **kwargs):
+        """
+        Ejecutar fn(*args, **kwargs) reintentando los errores transitorios
+
+        Raises:
+            El último error si no es transitorio o se agotan los intentos;
+            CircuitOpenError si la BD donante no se recupera
+        """
+        with self.lock:
+            self.calls += 1
+
+        attempt = 0
+        while True:
+            self.wait_if_open()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                kind = classify_error(e)
+                if kind is None:
+                    raise
+                self.record_failure(kind)
+                attempt += 1
+                if attempt >= self.max_attempts:
+                    with self.lock:
+                        self.failures += 1
+                    raise
+                delay = self.backoff(attempt)
+                with self.lock:
+                    self.retries += 1
+                print(f"\n   ⚠️ Error transitorio ({kind}): {str(e)[:120]} — "
+                      f"reintento {attempt}/{self.max_attempts - 1} en {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            self.record_success()
+            return result
+
+    def summary(self):
+        """Contadores para el informe de la ejecución"""
+        with self.lock:
+            return {
+                'calls': self.calls,
+                'retries': self.retries,
+                'failures': self.failures,
+                'circuit_opens': self.circuit_opens,
+                'errors': dict(self.errors),
+            }
@@ -0,0 +1,290 @@
+"""
+Extracción completa de la BD donante a partir de EXTRACT_REGISTRY
+
+Un solo comando para todas las tablas (principales, flashcards, CMS,
+academias y user_test_answers por rangos de id):
+- Cada tabla empieza en cuanto terminan las de su depends_on
+- Como mucho EXTRACT_TABLE_CONCURRENCY tablas a la vez; las particionadas usan
+  además EXTRACT_WORKERS hilos para sus rangos
+- Un RateLimiter y un RequestExecutor comunes para todas las peticiones
+- Al terminar se informa del rendimiento de cada tabla (registros/s)
+- El extractor es el de EXTRACT_BACKEND: con copy y EXTRACT_CONSISTENT todas
+  las tablas (y los rangos de las particionadas) se leen dentro del mismo
+  snapshot exportado
+
+Uso:
+    python3 extract/scheduler.py [--groups core,flashcards] [--tables users,user_tests]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    EXTRACT_REGISTRY, EXTRACT_TABLE_CONCURRENCY, EXTRACT_WORKERS, EXTRACT_RATE_LIMIT, FORCE_DOWNLOAD,
+    EXTRACT_BACKEND
+)
+from extract.extract_data import get_extractor
+from extract.rate_limit import RateLimiter
+
+
+def select_entries(registry=None, groups=None, tables=None):
+    """
+    Entradas del registro a extraer
+
+    Args:
+        registry: Lista de entradas (por defecto EXTRACT_REGISTRY)
+        groups: Grupos a incluir (por defecto todos)
+        tables: Tablas concretas a incluir (por defecto todas las de los grupos)
+    """
+    registry = EXTRACT_REGISTRY if registry is None else registry
+    entries = [
+        entry for entry in registry
+        if (not groups or entry['group'] in groups) and (not tables or entry['table'] in tables)
+    ]
+    if tables:
+        unknown = set(tables) - {entry['table'] for entry in entries}
+        if unknown:
+            raise ValueError(f"Tablas fuera del registro: {', '.join(sorted(unknown))}")
+    return entries
+
+
+def check_dependencies(entries):
+    """
+    Validar el grafo de dependencias (sin ciclos)
+
+    Las dependencias que no están en la selección se dan por satisfechas
+    (ej: extraer solo flashcards no obliga a extraer sus padres).
+
+    Returns:
+        dict: tabla -> set de tablas de la selección de las que depende
+    """
+    selected = {entry['table'] for entry in entries}
+    deps = {
+        entry['table']: {dep for dep in entry.get('depends_on', []) if dep in selected}
+        for entry in entries
+    }
+
+    pending = dict(deps)
+    done = set()
+    while pending:
+        ready = [table for table, required in pending.items() if required <= done]
+        if not ready:
+            raise ValueError(f"Dependencias circulares entre: {', '.join(sorted(pending))}")
+        for table in ready:
+            done.add(table)
+            del pending[table]
+    return deps
+
+
+class ExtractionScheduler:
+    """
+    Planificador de la extracción de varias tablas con dependencias
+
+    Uso:
+        scheduler = ExtractionScheduler(extractor, select_entries(groups=['core']))
+        scheduler.run()
+    """
+
+    def __init__(self, extractor, entries, concurrency=None, workers=None, rate_limit=None):
+        self.extractor = extractor
+        self.entries = {entry['table']: entry for entry in entries}
+        self.order = [entry['table'] for entry in entries]
+        self.deps = check_dependencies(entries)
+        self.concurrency = concurrency or EXTRACT_TABLE_CONCURRENCY
+        self.workers = workers or EXTRACT_WORKERS
+        rate_limit = EXTRACT_RATE_LIMIT if rate_limit is None else rate_limit
+        self.extractor.limiter = RateLimiter(rate_limit) if rate_limit else None
+
+        self.status = {}  # tabla -> 'done', 'failed' o 'skipped'
+        self.timings = {}  # tabla -> segundos de reloj
+        self.positions = {}  # tabla -> línea de su barra de progreso
+
+    def run_entry(self, entry):
+        """Extraer una tabla del registro en un hilo del pool"""
+        table_name = entry['table']
+        partition = entry.get('partition')
+        start = time.monotonic()
+        try:
+            if partition:
+                self.extractor.extract_table_sharded(
+                    table_name,
+                    partition['output'],
+                    column=partition.get('column', 'id'),
+                    num_shards=partition.get('shards'),
+                    workers=self.workers
+                )
+            else:
+                self.extractor.extract_table_in_worker(
+                    table_name, entry['output'], entry['order_by'], self.positions[table_name]
+                )
+        finally:
+            self.timings[table_name] = time.monotonic() - start
+
+    def is_pending(self, table_name):
+        return table_name not in self.status and table_name not in self.positions
+
+    def ready_tables(self):
+        """
+        Tablas pendientes cuyas dependencias ya terminaron bien
+
+        Las que dependen de una tabla fallida (directa o indirectamente) se omiten.
+        """
+        skipped = True
+        while skipped:
+            skipped = False
+            for table_name in filter(self.is_pending, self.order):
+                if any(self.status.get(dep) in ('failed', 'skipped') for dep in self.deps[table_name]):
+                    self.status[table_name] = 'skipped'
+                    print(f"   ⚠️ {table_name}: se omite porque falló una dependencia")
+                    skipped = True
+
+        return [
+            table_name for table_name in filter(self.is_pending, self.order)
+            if all(self.status.get(dep) == 'done' for dep in self.deps[table_name])
+        ]
+
+    def run(self):
+        """
+        Extraer todas las tablas seleccionadas
+
+        Raises:
+            RuntimeError: Si falla alguna tabla con required=True (las demás
+                tablas independientes se extraen igualmente)
+        """
+        print(f"ℹ️ Scheduler: {len(self.order)} tablas, hasta {self.concurrency} a la vez, "
+              f"{self.workers} workers por tabla particionada")
+
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            while True:
+                for table_name in self.ready_tables():
+                    self.positions[table_name] = len(self.positions)
+                    future = pool.submit(self.run_entry, self.entries[table_name])
+                    running[future] = table_name
+
+                if not running:
+                    break
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    table_name = running.pop(future)
+                    try:
+                        future.result()
+                        self.status[table_name] = 'done'
+                    except Exception as e:
+                        self.status[table_name] = 'failed'
+                        level = '✗' if self.entries[table_name].get('required', True) else '⚠️'
+                        print(f"\n   {level} Error extrayendo {table_name}: {str(e)[:200]}")
+
+        self.record_throughput()
+
+        failed = [
+            table_name for table_name in self.order
+            if self.status.get(table_name) in ('failed', 'skipped')
+            and self.entries[table_name].get('required', True)
+        ]
+        if failed:
+            raise RuntimeError(f"Tablas fallidas: {', '.join(failed)}")
+
+    def record_throughput(self):
+        """Añadir a las métricas el estado y rendimiento de reloj de cada tabla"""
+        for table_name in self.order:
+            seconds = self.timings.get(table_name)
+            rows = self.extractor.metrics.tables.get(table_name, {}).get('rows')
+            self.extractor.metrics.record(
+                table_name,
+                status=self.status.get(table_name),
+                wall_seconds=round(seconds, 2) if seconds is not None else None,
+                wall_rows_per_second=round(rows / seconds) if rows and seconds else None
+            )
+
+    def print_report(self):
+        """Rendimiento por tabla en consola"""
+        print(f"\n   {'Tabla':<28}{'Estado':<10}{'Registros':>12}{'Segundos':>10}{'Reg/s':>10}")
+        for table_name in self.order:
+            values = self.extractor.metrics.tables.get(table_name, {})
+            rows = values.get('rows')
+            seconds = values.get('wall_seconds')
+            rate = values.get('wall_rows_per_second')
+            print(f"   {table_name:<28}{self.status.get(table_name, '-'):<10}"
+                  f"{f'{rows:,}' if rows is not None else '-':>12}"
+                  f"{seconds if seconds is not None else '-':>10}"
+                  f"{f'{rate:,}' if rate else '-':>10}")
+
+
+def extract_registry(groups=None, tables=None, concurrency=None, workers=None, rate_limit=None):
+    """
+    Conectar y extraer las tablas del registro seleccionadas
+
+    Returns:
+        bool: True si todas las tablas obligatorias se extrajeron
+    """
+    entries = select_entries(groups=groups, tables=tables)
+
+    print("\n" + "="*60)
+    print("🚀 EXTRACCIÓN COMPLETA - REGISTRO DE TABLAS")
+    print("="*60)
+    if FORCE_DOWNLOAD:
+        print("⚠️ FORCE_DOWNLOAD = True - Descargando datos nuevos")
+    else:
+        print("ℹ️ FORCE_DOWNLOAD = False - Usando datos existentes si están disponibles")
+    print(f"ℹ️ EXTRACT_BACKEND = {EXTRACT_BACKEND}")
+    print("="*60)
+
+    extractor = get_extractor(EXTRACT_BACKEND)
+    if not extractor.connect():
+        return False
+
+    scheduler = ExtractionScheduler(extractor, entries, concurrency, workers, rate_limit)
+    start = time.monotonic()
+    try:
+        extractor.begin_snapshot()
+        scheduler.run()
+        return True
+    except Exception as e:
+        print(f"\n✗ Error durante la extracción: {e}")
+        return False
+    finally:
+        extractor.end_snapshot()
+        extractor.save_metrics()
+        extractor.close()
+
+        print("\n" + "="*60)
+        print(f"✓ EXTRACCIÓN TERMINADA en {time.monotonic() - start:.0f}s")
+        scheduler.print_report()
+        print(f"   Métricas guardadas en {extractor.metrics.path}")
+        print("="*60)
+
+
+def split_list(value):
+    return [item.strip() for item in value.split(',') if item.strip()] if value else None
+
+
+def main():
+    """Función principal"""
+    parser = argparse.ArgumentParser(description='Extraer todas las tablas del registro')
+    parser.add_argument('--groups', help='Grupos separados por comas (core, flashcards, cms, academies)')
+    parser.add_argument('--tables', help='Tablas concretas separadas por comas')
+    parser.add_argument('--concurrency', type=int, default=None,
+                        help=f'Tablas simultáneas (por defecto {EXTRACT_TABLE_CONCURRENCY})')
+    parser.add_argument('--workers', type=int, default=None,
+                        help=f'Hilos por tabla particionada (por defecto {EXTRACT_WORKERS})')
+    parser.add_argument('--rate-limit', type=float, default=None,
+                        help='Peticiones por segundo máximas entre todas las tablas (0 = sin límite)')
+    args = parser.parse_args()
+
+    return extract_registry(
+        groups=split_list(args.groups),
+        tables=split_list(args.tables),
+        concurrency=args.concurrency,
+        workers=args.workers,
+        rate_limit=args.rate_limit
+    )
+
+
+if __name__ == '__main__':
+    success = main()
+    sys.exit(0 if success else 1)
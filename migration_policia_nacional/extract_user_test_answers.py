@@ -2,127 +2,190 @@
 """
 Extrae user_test_answers de la BD antigua en batches
 Maneja millones de registros dividiéndolos en múltiples archivos
+Reanudable: cada archivo completado se registra en data/user_test_answers.manifest.json
 """
-import json
 import sys
 import os
 from supabase import create_client
-from tqdm import tqdm
 import time
+import argparse
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from config import OLD_DB_CONFIG, DATA_DIR
+from config import (
+    OLD_DB_CONFIG, FORCE_DOWNLOAD, EXTRACT_WORKERS, EXTRACT_RATE_LIMIT, EXTRACT_COLUMNS, EXTRACT_REGISTRY
+)
+from extract.extract_data import OldDBExtractor, count_rows
+from extract.manifest import ExtractionManifest
+from extract.page_size import PageSizeController
+from extract.metrics import RunMetrics
+from extract.retry import RequestExecutor
+from snapshot import SnapshotWriter, meta_path
 
 BATCH_SIZE = 50000  # 50K registros por archivo
-MAX_RETRIES = 3
+PAGE_SIZE = 1000  # Registros por petición iniciales (keyset por id, tamaño adaptativo)
+
+# Archivos por rango de id definidos en el registro (mismo formato en ambos modos)
+PARTITION = next(entry for entry in EXTRACT_REGISTRY if entry['table'] == 'user_test_answers')['partition']
+def part_file(batch_num):
+    """Ruta del archivo de un batch"""
+    return PARTITION['output'].format(part=batch_num)
+
+def extract_batch(client, after_id, limit, columns='*'):
+    """Extraer una página (id > after_id); los reintentos los hace RequestExecutor"""
+    query = client.table('user_test_answers').select(columns)
+    if after_id is not None:
+        query = query.gt('id', after_id)
+    response = query.order('id').limit(limit).execute()
+    return response.data
+
+def extract_parallel(workers, shards, rate_limit, columns):
+    """
+    Extraer user_test_answers por rangos de id en paralelo
+
+    Cada shard se guarda en user_test_answers_NNN.json (mismo formato que el modo secuencial)
+    """
+    extractor = OldDBExtractor()
+    if not extractor.connect():
+        return False
+    extractor.columns['user_test_answers'] = columns
 
-def save_json(data, filepath):
-    """Guardar JSON"""
-    os.makedirs(os.path.dirname(filepath), exist_ok=True)
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    try:
+        parts = extractor.extract_table_sharded(
+            'user_test_answers',
+            PARTITION['output'],
+            column=PARTITION['column'],
+            num_shards=shards,
+            workers=workers,
+            rate_limit=rate_limit,
+            batch_size=PAGE_SIZE
+        )
+        extractor.save_metrics()
+    finally:
+        extractor.close()
 
-def extract_batch(client, offset, limit):
-    """Extraer un batch con retry"""
-    for attempt in range(MAX_RETRIES):
-        try:
-            response = client.table('user_test_answers')\
-                .select('*')\
-                .range(offset, offset + limit - 1)\
-                .execute()
-            return response.data
-        except Exception as e:
-            if attempt < MAX_RETRIES - 1:
-                wait_time = (attempt + 1) * 5
-                print(f"\n   ⚠️  Error en offset {offset}, reintentando en {wait_time}s...")
-                time.sleep(wait_time)
-            else:
-                raise e
+    print("\n" + "="*60)
+    print("✓ EXTRACCIÓN COMPLETADA")
+    print(f"   Total extraído: {sum(count for _, count in parts):,} registros")
+    print(f"   Archivos generados: {len(parts)}")
+    print("="*60)
+
+    return True
 
 def main():
     """Función principal"""
+    parser = argparse.ArgumentParser(description='Extraer user_test_answers')
+    parser.add_argument('--workers', type=int, default=1,
+                        help=f'Hilos en paralelo por rangos de id (1 = secuencial, recomendado {EXTRACT_WORKERS})')
+    parser.add_argument('--shards', type=int, default=None,
+                        help='Número de rangos de id / archivos de salida (por defecto workers * 4)')
+    parser.add_argument('--rate-limit', type=float, default=EXTRACT_RATE_LIMIT,
+                        help='Peticiones por segundo máximas a la BD donante (0 = sin límite)')
+    parser.add_argument('--columns', default=','.join(EXTRACT_COLUMNS['user_test_answers']),
+                        help='Columnas a extraer separadas por comas (* para todas)')
+    args = parser.parse_args()
+    columns = '*' if args.columns.strip() == '*' else [c.strip() for c in args.columns.split(',') if c.strip()]
+
     print("\n" + "="*60)
     print("📥 EXTRACCIÓN DE USER_TEST_ANSWERS")
+    if args.workers > 1:
+        print(f"⚡ MODO: Paralelo ({args.workers} workers)")
     print("="*60)
 
+    if args.workers > 1:
+        try:
+            return extract_parallel(args.workers, args.shards, args.rate_limit, columns)
+        except Exception as e:
+            print(f"\n✗ Error: {e}")
+            import traceback
+            traceback.print_exc()
+            return False
+
     try:
         # Conectar
         client = create_client(OLD_DB_CONFIG['url'], OLD_DB_CONFIG['key'])
         print(f"✓ Conectado a BD antigua")
 
-        # Estimar total (sin COUNT que da timeout)
-        # Intentamos obtener el último ID
+        # Estimar total (sin COUNT que da timeout): max(id) - min(id) + 1
         print(f"\n📊 Estimando total de registros...")
-        try:
-            last_record = client.table('user_test_answers')\
-                .select('id')\
-                .order('id', desc=True)\
-                .limit(1)\
-                .execute()
-
-            if last_record.data:
-                max_id = last_record.data[0]['id']
-                print(f"   Último ID encontrado: {max_id:,}")
-                print(f"   Estimación: ~{max_id:,} registros")
-            else:
-                print(f"   ⚠️  No se pudo estimar total")
-                max_id = 10000000  # Default: 10M
-        except:
-            print(f"   ⚠️  Error estimando, usando 10M como máximo")
-            max_id = 10000000
-
-        # Extraer en batches
-        print(f"\n📤 Extrayendo en batches de {BATCH_SIZE:,} registros...")
+        estimated = count_rows(client, 'user_test_answers', 'estimated')
+        print(f"   Estimación: ~{estimated:,} registros")
+
+        # Extraer en batches (reanudando desde el manifest si existe)
+        manifest = ExtractionManifest.load('user_test_answers')
+        if FORCE_DOWNLOAD or manifest.plan:
+            # FORCE o el manifest viene del modo paralelo: empezar de cero
+            manifest.reset(remove_files=True)
 
-        offset = 0
         batch_num = 1
+        last_id = None
         total_extracted = 0
-        empty_batches = 0
-        max_empty_batches = 5  # Parar si 5 batches consecutivos vacíos
 
-        while empty_batches < max_empty_batches:
-            try:
-                print(f"\n   Batch {batch_num} (offset {offset:,})...")
+        while manifest.is_part_complete(batch_num, part_file(batch_num)):
+            entry = manifest.parts[str(batch_num)]
+            last_id = entry['cursor']
+            total_extracted += entry['rows']
+            batch_num += 1
 
-                # Extraer batch
-                batch_data = extract_batch(client, offset, BATCH_SIZE)
+        if batch_num > 1:
+            print(f"\n   ℹ️ Reanudando: {batch_num - 1} archivos ya completados "
+                  f"({total_extracted:,} registros, último id {last_id:,})")
 
-                if not batch_data:
-                    empty_batches += 1
-                    print(f"      ⚠️  Batch vacío ({empty_batches}/{max_empty_batches})")
-                    offset += BATCH_SIZE
-                    continue
+        print(f"\n📤 Extrayendo en batches de {BATCH_SIZE:,} registros...")
+        page_size = PageSizeController(initial=PAGE_SIZE)
+        requests = RequestExecutor()
+        select = '*' if columns == '*' else ','.join(columns)
+        start = time.monotonic()
 
-                # Reset empty counter
-                empty_batches = 0
+        finished = False
+        while not finished:
+            output_file = part_file(batch_num)
+            print(f"\n   Batch {batch_num} (id > {last_id if last_id is not None else '-'})...")
 
-                # Guardar batch
-                output_file = f"{DATA_DIR}/user_test_answers_{batch_num:03d}.json"
-                save_json(batch_data, output_file)
+            try:
+                with SnapshotWriter(output_file) as writer:
+                    while writer.count < BATCH_SIZE:
+                        page = requests.call(
+                            page_size.fetch,
+                            lambda limit: extract_batch(client, last_id, limit, select),
+                            max_rows=BATCH_SIZE - writer.count
+                        )
+                        if not page:
+                            finished = True
+                            break
+                        writer.write_rows(page)
+                        last_id = page[-1]['id']
+            except Exception as e:
+                # El archivo a medias se descarta; el manifest conserva el último cursor confirmado
+                print(f"\n   ✗ Error en batch {batch_num}: {str(e)[:200]}")
+                print(f"   ℹ️ Vuelve a ejecutar para reanudar desde el batch {batch_num}")
+                return False
 
-                total_extracted += len(batch_data)
-                print(f"      ✓ {len(batch_data):,} registros guardados en {output_file}")
-                print(f"      📊 Total acumulado: {total_extracted:,}")
+            if writer.count == 0:
+                os.remove(output_file)
+                os.remove(meta_path(output_file))
+                break
 
-                # Siguiente batch
-                offset += BATCH_SIZE
-                batch_num += 1
+            manifest.commit_part(batch_num, output_file, writer.count, cursor=last_id)
 
-                # Break si el batch es menor que BATCH_SIZE (último batch)
-                if len(batch_data) < BATCH_SIZE:
-                    print(f"\n   ✓ Último batch detectado (< {BATCH_SIZE:,} registros)")
-                    break
+            total_extracted += writer.count
+            print(f"      ✓ {writer.count:,} registros guardados en {output_file}")
+            print(f"      📊 Total acumulado: {total_extracted:,}")
 
-            except Exception as e:
-                print(f"\n   ✗ Error en batch {batch_num}: {str(e)[:200]}")
-                # Continuar con siguiente batch
-                offset += BATCH_SIZE
-                batch_num += 1
+            batch_num += 1
+
+        metrics = RunMetrics()
+        seconds = time.monotonic() - start
+        metrics.record(
+            'user_test_answers', mode='sequential', rows=total_extracted,
+            seconds=round(seconds, 2), **page_size.summary()
+        )
+        metrics.record('_requests', **requests.summary())
+        metrics.save()
 
         print("\n" + "="*60)
         print("✓ EXTRACCIÓN COMPLETADA")
         print(f"   Total extraído: {total_extracted:,} registros")
-        print(f"   Archivos generados: {batch_num - 1}")
+        print(f"   Archivos generados: {len(manifest.parts)}")
         print("="*60)
 
         return True
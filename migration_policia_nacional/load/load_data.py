@@ -12,6 +12,8 @@ import psycopg2.extras
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import NEW_DB_CONFIG, TRANSFORMED_FILES, BATCH_SIZE
+from snapshot import load_json as load_data_file
+from id_index import update_id_index
 
 class NewDBLoader:
     def __init__(self):
@@ -39,8 +41,7 @@ class NewDBLoader:
     def load_json(self, filepath):
         """Cargar datos de archivo JSON"""
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return load_data_file(filepath)
         except FileNotFoundError:
             print(f"⚠️ Archivo no encontrado: {filepath}")
             return []
@@ -205,6 +206,9 @@ class NewDBLoader:
         # Commit final
         conn.commit()
         cur.close()
+
+        # Preguntas y opciones para transform_user_test_answers.py
+        update_id_index(conn, names=['questions', 'question_options'])
         conn.close()
 
         print(f"   ✓ Insertadas: {inserted:,} questions")
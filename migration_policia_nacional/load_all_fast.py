@@ -4,11 +4,16 @@ Script rápido para cargar topic_types, categories, topics y questions
 Usa psycopg2 directamente, sin Supabase client
 """
 import json
+import os
 import sys
 import psycopg2
 import psycopg2.extras
 from tqdm import tqdm
 
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from snapshot import load_json as load_data_file
+from id_index import update_id_index
+
 # Rutas de archivos
 TRANSFORMED_FILES = {
     'topic_types': 'data/transformed/topic_types.json',
@@ -21,8 +26,7 @@ TRANSFORMED_FILES = {
 def load_json(filepath):
     """Cargar datos de archivo JSON"""
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return load_data_file(filepath)
     except FileNotFoundError:
         print(f"⚠️ Archivo no encontrado: {filepath}")
         return [] if filepath.endswith('.json') else {}
@@ -216,6 +220,9 @@ def main():
                 all_success = False
                 print(f"   ⚠️ Carga de questions tuvo errores")
 
+            # Preguntas y opciones para transform_user_test_answers.py
+            update_id_index(conn, names=['questions', 'question_options'])
+
         print("\n" + "="*60)
         if all_success:
             print("✓ CARGA COMPLETADA EXITOSAMENTE")
@@ -4,10 +4,15 @@ Script rápido para cargar solo questions
 Usa psycopg2 directamente, sin Supabase client
 """
 import json
+import os
 import sys
 import psycopg2
 from tqdm import tqdm
 
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from snapshot import load_json as load_data_file
+from id_index import update_id_index
+
 # Rutas de archivos
 QUESTIONS_FILE = 'data/transformed/questions.json'
 OPTIONS_MAP_FILE = 'data/transformed/question_options.json'
@@ -15,8 +20,7 @@ OPTIONS_MAP_FILE = 'data/transformed/question_options.json'
 def load_json(filepath):
     """Cargar datos de archivo JSON"""
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return load_data_file(filepath)
     except FileNotFoundError:
         print(f"⚠️ Archivo no encontrado: {filepath}")
         return []
@@ -120,6 +124,9 @@ def load_questions():
     # Commit final
     conn.commit()
     cur.close()
+
+    # Preguntas y opciones para transform_user_test_answers.py
+    update_id_index(conn, names=['questions', 'question_options'])
     conn.close()
 
     print(f"\n   ✓ Insertadas: {inserted:,} questions")
@@ -0,0 +1,300 @@
+"""
+Tablas de búsqueda compactas para ids enteros (sustituyen a set/dict de Python)
+
+- IdSet: ids válidos (array int64 ordenado, búsqueda binaria)
+- IdMap: id antiguo → id nuevo (claves ordenadas + valores, o un array denso
+  indexado por id - base cuando los ids son casi consecutivos)
+- OptionTable: question_id → [option_id, ...] en orden (formato CSR:
+  preguntas ordenadas, offsets y un único array de opciones)
+
+Un int64 ocupa 8 bytes frente a los ~30-100 de un int dentro de un set o
+dict, y las tablas se envían a los procesos worker como unos pocos buffers.
+
+save_lookups / load_lookups guardan varias tablas en un solo archivo binario
+(cabecera JSON + arrays int64 alineados). load_lookups usa mmap: la tabla no
+se copia a memoria y varios procesos comparten las mismas páginas.
+
+Uso:
+    valid = IdSet.from_ids(row[0] for row in cur)
+    save_lookups('data/transformed/lookups.bin', valid_questions=valid)
+    valid = load_lookups('data/transformed/lookups.bin')['valid_questions']
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from snapshot import load_json
+
+MAGIC = b'OPNLKP1\n'
+ALIGN = 8
+DENSE_RATIO = 2  # IdMap denso si el rango de ids es como mucho 2x el número de claves
+MISSING = -2 ** 63  # Hueco de un IdMap denso
+
+
+def to_array(values):
+    """Copia int64 de cualquier buffer o iterable (para serializar tablas en mmap)"""
+    result = array('q')
+    if isinstance(values, (array, memoryview)):
+        result.frombytes(memoryview(values).cast('B'))
+    else:
+        result.extend(values)
+    return result
+
+
+class LookupTable:
+    """
+    Base de las tablas: un dict de arrays int64 y parámetros escalares
+
+    Al serializarse (pickle para un pool de procesos) los arrays se copian,
+    así también funcionan las tablas abiertas con mmap.
+    """
+    kind = None
+
+    def __init__(self, arrays, params=None):
+        self.arrays = arrays
+        self.params = params or {}
+
+    def __reduce__(self):
+        arrays = {name: to_array(values) for name, values in self.arrays.items()}
+        return (self.__class__, (arrays, self.params))
+
+    def nbytes(self):
+        return sum(len(values) * 8 for values in self.arrays.values())
+
+
+class IdSet(LookupTable):
+    """Conjunto de ids enteros ordenados"""
+    kind = 'idset'
+
+    def __init__(self, arrays, params=None):
+        super().__init__(arrays, params)
+        self.ids = arrays['ids']
+
+    @classmethod
+    def from_ids(cls, ids):
+        return cls({'ids': array('q', sorted(set(ids)))})
+
+    def __contains__(self, value):
+        try:
+            i = bisect_left(self.ids, value)
+        except TypeError:  # None, cadenas...
+            return False
+        return i < len(self.ids) and self.ids[i] == value
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return iter(self.ids)
+
+
+class IdMap(LookupTable):
+    """
+    Mapeo id → id
+
+    Con ids casi consecutivos se guarda denso (values[id - base], búsqueda
+    directa); si no, claves ordenadas y búsqueda binaria.
+    """
+    kind = 'idmap'
+
+    def __init__(self, arrays, params=None):
+        super().__init__(arrays, params)
+        self.keys = arrays.get('keys')
+        self.values = arrays['values']
+        self.base = self.params.get('base')
+        self.size = self.params.get('size', len(self.values))
+
+    @classmethod
+    def from_items(cls, items):
+        pairs = sorted(items)
+        if not pairs:
+            return cls({'keys': array('q'), 'values': array('q')})
+
+        base, last = pairs[0][0], pairs[-1][0]
+        span = last - base + 1
+        if span <= DENSE_RATIO * len(pairs):
+            values = array('q', [MISSING]) * span
+            for key, value in pairs:
+                values[key - base] = value
+            return cls({'values': values}, {'base': base, 'size': len(pairs)})
+
+        return cls({
+            'keys': array('q', (key for key, _ in pairs)),
+            'values': array('q', (value for _, value in pairs))
+        })
+
+    @classmethod
+    def from_dict(cls, mapping):
+        """Desde un dict, también con claves str (mapeos guardados en JSON)"""
+        return cls.from_items((int(key), value) for key, value in mapping.items())
+
+    def get(self, key, default=None):
+        try:
+            if self.base is not None:
+                i = key - self.base
+                if 0 <= i < len(self.values) and self.values[i] != MISSING:
+                    return self.values[i]
+                return default
+            i = bisect_left(self.keys, key)
+        except TypeError:
+            return default
+        if i < len(self.keys) and self.keys[i] == key:
+            return self.values[i]
+        return default
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        return self.size
+
+    def items(self):
+        if self.base is None:
+            return zip(self.keys, self.values)
+        return (
+            (self.base + i, value) for i, value in enumerate(self.values) if value != MISSING
+        )
+
+
+class OptionTable(LookupTable):
+    """
+    question_id → option_ids de la pregunta en orden (formato CSR)
+
+    table[question_id] devuelve una vista con len() e índices, como la lista
+    que devolvía el dict anterior.
+    """
+    kind = 'options'
+
+    def __init__(self, arrays, params=None):
+        super().__init__(arrays, params)
+        self.questions = arrays['questions']
+        self.offsets = arrays['offsets']
+        self.options = arrays['options']
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Args:
+            rows: (question_id, option_id) ordenados por question_id y orden de opción
+        """
+        questions, offsets, options = array('q'), array('q', [0]), array('q')
+        for question_id, option_id in rows:
+            if not questions or questions[-1] != question_id:
+                if questions:
+                    offsets.append(len(options))
+                    if question_id < questions[-1]:
+                        raise ValueError("OptionTable.from_rows: filas sin ordenar por question_id")
+                questions.append(question_id)
+            options.append(option_id)
+        if questions:
+            offsets.append(len(options))
+        return cls({'questions': questions, 'offsets': offsets, 'options': options})
+
+    def find(self, question_id):
+        try:
+            i = bisect_left(self.questions, question_id)
+        except TypeError:
+            return -1
+        if i < len(self.questions) and self.questions[i] == question_id:
+            return i
+        return -1
+
+    def get(self, question_id, default=None):
+        i = self.find(question_id)
+        if i < 0:
+            return default
+        return self.options[self.offsets[i]:self.offsets[i + 1]]
+
+    def __getitem__(self, question_id):
+        options = self.get(question_id)
+        if options is None:
+            raise KeyError(question_id)
+        return options
+
+    def __contains__(self, question_id):
+        return self.find(question_id) >= 0
+
+    def __len__(self):
+        return len(self.questions)
+
+
+TABLE_KINDS = {cls.kind: cls for cls in (IdSet, IdMap, OptionTable)}
+
+
+def save_lookups(filepath, **tables):
+    """
+    Guardar varias tablas en un archivo binario (escritura atómica)
+
+    Formato: MAGIC, longitud de la cabecera (uint64), cabecera JSON y los
+    arrays int64 (orden de bytes de la máquina) alineados a 8 bytes.
+    """
+    header = {}
+    offset = 0
+    for name, table in tables.items():
+        entry = {'kind': table.kind, 'params': table.params, 'arrays': {}}
+        for array_name, values in table.arrays.items():
+            entry['arrays'][array_name] = [offset, len(values)]
+            offset += len(values) * 8
+        header[name] = entry
+
+    header_bytes = json.dumps(header).encode('utf-8')
+    data_start = len(MAGIC) + 8 + len(header_bytes)
+    padding = -data_start % ALIGN
+
+    os.makedirs(os.path.dirname(filepath) or '.', exist_ok=True)
+    tmp_path = f"{filepath}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(header_bytes) + padding))
+        f.write(header_bytes + b' ' * padding)
+        for table in tables.values():
+            for values in table.arrays.values():
+                f.write(to_array(values).tobytes())
+    os.replace(tmp_path, filepath)
+
+
+def load_lookups(filepath, names=None):
+    """
+    Abrir las tablas de un archivo de save_lookups con mmap (sin copiarlas)
+
+    Args:
+        names: Tablas a abrir (por defecto todas)
+
+    Returns:
+        dict: nombre → IdSet / IdMap / OptionTable
+    """
+    with open(filepath, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{filepath} no es un archivo de tablas de búsqueda")
+        header_size = struct.unpack('<Q', f.read(8))[0]
+        header = json.loads(f.read(header_size))
+        data_start = len(MAGIC) + 8 + header_size
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    data = memoryview(buffer)[data_start:]
+    tables = {}
+    for name, entry in header.items():
+        if names is not None and name not in names:
+            continue
+        arrays = {
+            array_name: data[offset:offset + count * 8].cast('q')
+            for array_name, (offset, count) in entry['arrays'].items()
+        }
+        tables[name] = TABLE_KINDS[entry['kind']](arrays, entry['params'])
+    return tables
+
+
+def load_id_map(filepath):
+    """Mapeo guardado como JSON ({"old_id": new_id}) como IdMap"""
+    return IdMap.from_dict(load_json(filepath))
@@ -7,7 +7,7 @@ import os
 from datetime import datetime
 
 # Importar módulos de ETL
-from extract.extract_data import OldDBExtractor
+from extract.extract_data import get_extractor
 from transform.transform_data import DataTransformer
 from load.load_data import NewDBLoader
 from validate.validate import MigrationValidator
@@ -67,7 +67,7 @@ def main():
     current_step += 1
     print_step(current_step, total_steps, "EXTRACCIÓN DE DATOS")
 
-    extractor = OldDBExtractor()
+    extractor = get_extractor()
     try:
         if not extractor.connect():
             print("\n✗ Error: No se pudo conectar a la BD antigua")
@@ -248,24 +248,14 @@ main() {
     else
         print_info "Extrayendo desde Supabase REMOTA (producción)..."
 
-        # Extraer datos principales
-        run_cmd "python3 extract/extract_data.py" || {
+        # Extraer todas las tablas del registro (principales, flashcards, CMS,
+        # academias y user_test_answers por rangos de id) con dependencias y
+        # límites de concurrencia comunes
+        run_cmd "python3 extract/scheduler.py" || {
             print_error "Error en extracción de datos principales"
             exit 1
         }
 
-        # Extraer flashcards
-        run_cmd "python3 extract_flashcards.py" || print_warning "Error extrayendo flashcards (continuando...)"
-
-        # Extraer CMS y challenges
-        run_cmd "python3 extract_cms_and_challenges.py" || print_warning "Error extrayendo CMS (continuando...)"
-
-        # Extraer academias
-        run_cmd "python3 extract_academies.py" || print_warning "Error extrayendo academias (continuando...)"
-
-        # Extraer user_test_answers
-        run_cmd "python3 extract_user_test_answers.py" || print_warning "Error extrayendo user_test_answers"
-
         print_success "Extracción completada"
     fi
 
@@ -343,8 +333,8 @@ main() {
         exit 1
     }
 
-    # Usar load_fast.py si existe mapping (para user_test_answers)
-    if [ -f "data/transformed/user_test_id_old_to_new.json" ]; then
+    # Usar load_fast.py si se transformaron user_tests (para user_test_answers)
+    if [ -f "data/transformed/user_tests_id_mapping.json" ]; then
         print_info "Usando carga ultra-rápida para user_test_answers..."
         run_cmd "python3 load_fast.py" || print_warning "Error en carga rápida de answers"
     fi
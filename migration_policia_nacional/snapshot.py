@@ -0,0 +1,441 @@
+"""
+Snapshots de datos extraídos en formato NDJSON (un registro JSON por línea)
+
+- SnapshotWriter: añade cada página al archivo según llega (memoria acotada a una página)
+- iter_snapshot: generador que lee registro a registro sin json.load del archivo completo
+- iter_snapshot_blocks: igual, pero en bloques de registros decodificados de una vez
+  (para los transforms por columnas)
+- load_snapshot: lista completa (para tablas pequeñas que se agrupan/ordenan en memoria)
+- check_snapshot: decide si un snapshot existente se reutiliza leyendo solo su
+  sidecar <archivo>.meta (registros, bytes, sha256, fecha de extracción)
+- load_json / save_json: sustitutos de los helpers de cada script (listas de
+  registros como snapshot, diccionarios/mapeos como JSON normal)
+
+El archivo se divide en bloques de SNAPSHOT_CHUNK_ROWS registros. Con
+SNAPSHOT_COMPRESSION=gzip cada bloque es un miembro gzip independiente
+(el archivo completo sigue siendo un gzip válido). El sidecar guarda el
+índice de bloques (offset, bytes, registros y rango de id), así se puede
+leer un bloque suelto (snapshot_chunks / iter_chunk, para repartir bloques
+entre procesos) o solo los bloques de un rango de id (iter_snapshot_range).
+
+Los lectores aceptan también los snapshots antiguos (array JSON con indent=2),
+así los archivos ya descargados en data/ siguen siendo válidos.
+"""
+import gzip
+import hashlib
+import json
+import os
+import sys
+import zlib
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from config import SNAPSHOT_COMPRESSION, SNAPSHOT_CHUNK_ROWS
+
+GZIP_MAGIC = b'\x1f\x8b'
+GZIP_LEVEL = 6
+BLOCK_BYTES = 1024 * 1024  # Texto decodificado de una vez por iter_snapshot_blocks
+
+
+class SnapshotWriter:
+    """
+    Escritor NDJSON con escritura atómica
+
+    Escribe en <archivo>.tmp y lo renombra al cerrar sin errores, de modo que
+    un snapshot a medias nunca sustituye a uno completo. El checksum y el
+    índice de bloques se calculan mientras se escribe y se guardan en el
+    sidecar <archivo>.meta.
+
+    Uso:
+        with SnapshotWriter('data/questions.json') as writer:
+            writer.write_rows(batch)
+    """
+
+    def __init__(self, filepath, compression=None, chunk_rows=None, key='id'):
+        self.filepath = filepath
+        self.tmp_path = f"{filepath}.tmp"
+        self.compression = (compression or SNAPSHOT_COMPRESSION).lower()
+        if self.compression not in ('gzip', 'none'):
+            raise ValueError(f"SNAPSHOT_COMPRESSION inválido: {self.compression}")
+        self.chunk_rows = chunk_rows or SNAPSHOT_CHUNK_ROWS
+        self.key = key
+        self.count = 0
+        self.bytes = 0
+        self.digest = hashlib.sha256()
+        self.file = None
+        self.chunks = []
+        self.chunk = None  # Bloque en curso
+        self.encoder = None  # Compresor del bloque en curso (gzip)
+
+    def open(self):
+        directory = os.path.dirname(self.filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(self.tmp_path, 'wb')
+        return self
+
+    def write_bytes(self, data):
+        self.file.write(data)
+        self.digest.update(data)
+        self.bytes += len(data)
+
+    def start_chunk(self):
+        self.chunk = {'offset': self.bytes, 'bytes': 0, 'rows': 0, 'min': None, 'max': None}
+        if self.compression == 'gzip':
+            self.encoder = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits=31: formato gzip
+
+    def finish_chunk(self):
+        """Cerrar el bloque en curso (un miembro gzip completo) y añadirlo al índice"""
+        if self.encoder is not None:
+            self.write_bytes(self.encoder.flush())
+            self.encoder = None
+        self.chunk['bytes'] = self.bytes - self.chunk['offset']
+        self.chunks.append(self.chunk)
+        self.chunk = None
+
+    def update_key_range(self, values):
+        """Ampliar el rango de `key` del bloque en curso (None si algún registro no lo tiene)"""
+        chunk = self.chunk
+        if chunk['rows'] and chunk['min'] is None:
+            return
+        try:
+            low, high = min(values), max(values)
+            if low is None or high is None:
+                raise TypeError
+            if chunk['rows']:
+                low, high = min(low, chunk['min']), max(high, chunk['max'])
+        except (TypeError, ValueError):
+            low = high = None
+        chunk['min'], chunk['max'] = low, high
+
+    def write_rows(self, rows):
+        """Añadir una página de registros (dicts) al snapshot"""
+        rows = list(rows)
+        try:
+            keys = [row[self.key] for row in rows]
+        except (KeyError, TypeError):
+            keys = None
+        self.write_lines(
+            [
+                (json.dumps(row, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+                for row in rows
+            ],
+            keys
+        )
+
+    def write_lines(self, lines, keys=None):
+        """
+        Añadir registros ya serializados (líneas NDJSON en bytes, con su salto de línea)
+
+        Lo usan los volcados COPY, que reciben el JSON de Postgres y no
+        necesitan parsearlo y volver a serializarlo.
+
+        Args:
+            lines: Líneas a escribir
+            keys: Valor de `key` de cada línea para el índice de bloques
+                (None si no se conoce: el bloque queda sin rango)
+        """
+        lines = list(lines)
+        self.count += len(lines)
+        start = 0
+        while start < len(lines):
+            if self.chunk is None:
+                self.start_chunk()
+            end = start + self.chunk_rows - self.chunk['rows']
+            part = lines[start:end]
+
+            data = b''.join(part)
+            self.write_bytes(self.encoder.compress(data) if self.encoder is not None else data)
+
+            self.update_key_range(keys[start:end] if keys is not None else None)
+            self.chunk['rows'] += len(part)
+            if self.chunk['rows'] >= self.chunk_rows:
+                self.finish_chunk()
+            start = end
+
+    def close(self):
+        """Cerrar y publicar el snapshot junto con su sidecar"""
+        if self.chunk is not None:
+            self.finish_chunk()
+        self.file.close()
+        os.replace(self.tmp_path, self.filepath)
+        write_snapshot_meta(
+            self.filepath, self.count, self.bytes, self.digest.hexdigest(),
+            compression=self.compression, key=self.key, chunks=self.chunks
+        )
+
+    def abort(self):
+        """Descartar el snapshot a medias"""
+        self.file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+def write_snapshot(rows, filepath, **options):
+    """Guardar una lista completa de registros como snapshot NDJSON (opciones de SnapshotWriter)"""
+    with SnapshotWriter(filepath, **options) as writer:
+        writer.write_rows(rows)
+    return writer.count
+
+
+def is_gzip(filepath):
+    """El archivo es un snapshot comprimido (cabecera gzip)"""
+    with open(filepath, 'rb') as f:
+        return f.read(2) == GZIP_MAGIC
+
+
+def iter_snapshot(filepath):
+    """
+    Leer un snapshot registro a registro
+
+    Args:
+        filepath: Archivo NDJSON, NDJSON gzip por bloques (o array JSON antiguo)
+
+    Yields:
+        dict: Cada registro
+    """
+    if is_gzip(filepath):
+        with gzip.open(filepath, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        return
+
+    with open(filepath, 'r', encoding='utf-8') as f:
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+
+        if first == '[':
+            # Formato antiguo: array JSON completo
+            f.seek(0)
+            yield from json.load(f)
+            return
+
+        f.seek(0)
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def iter_snapshot_blocks(filepath, block_bytes=BLOCK_BYTES):
+    """
+    Leer un snapshot en bloques de registros
+
+    Cada bloque de ~block_bytes se decodifica con una sola llamada a
+    json.loads (las líneas unidas como array) en lugar de una por línea.
+
+    Yields:
+        list: Registros (dicts) de cada bloque
+    """
+    if is_gzip(filepath):
+        f = gzip.open(filepath, 'rt', encoding='utf-8')
+    else:
+        f = open(filepath, 'r', encoding='utf-8')
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+        f.seek(0)
+        if first == '[':
+            # Formato antiguo: array JSON completo
+            with f:
+                yield json.load(f)
+            return
+
+    with f:
+        while True:
+            text = f.read(block_bytes)
+            if not text:
+                break
+            text += f.readline()  # Completar la última línea del bloque
+            lines = list(filter(str.strip, text.split('\n')))
+            if lines:
+                yield json.loads('[' + ','.join(lines) + ']')
+
+
+def load_snapshot(filepath):
+    """Cargar un snapshot completo en memoria como lista"""
+    return list(iter_snapshot(filepath))
+
+
+def snapshot_chunks(filepath):
+    """
+    Índice de bloques de un snapshot
+
+    Returns:
+        list: [{offset, bytes, rows, min, max}, ...] o None si el snapshot no tiene índice
+            (snapshots antiguos o volcados con COPY)
+    """
+    meta = read_snapshot_meta(filepath)
+    return meta.get('chunks') if meta else None
+
+
+def iter_chunk(filepath, chunk):
+    """Leer los registros de un solo bloque (seek al offset del índice)"""
+    with open(filepath, 'rb') as f:
+        f.seek(chunk['offset'])
+        data = f.read(chunk['bytes'])
+    if data[:2] == GZIP_MAGIC:
+        data = gzip.decompress(data)
+    for line in data.decode('utf-8').splitlines():
+        if line.strip():
+            yield json.loads(line)
+
+
+def iter_snapshot_range(filepath, lower=None, upper=None, key=None):
+    """
+    Leer solo los registros con lower <= key <= upper
+
+    Con índice se leen únicamente los bloques cuyo rango se solapa; sin él
+    se recorre el snapshot completo filtrando.
+    """
+    meta = read_snapshot_meta(filepath) or {}
+    key = key or meta.get('key') or 'id'
+
+    def in_range(value):
+        return value is not None and (lower is None or value >= lower) and (upper is None or value <= upper)
+
+    chunks = meta.get('chunks') if meta.get('key') == key else None
+    if chunks is None:
+        rows = iter_snapshot(filepath)
+    else:
+        rows = (
+            row
+            for chunk in chunks
+            if chunk['min'] is None or (
+                (lower is None or chunk['max'] >= lower) and (upper is None or chunk['min'] <= upper)
+            )
+            for row in iter_chunk(filepath, chunk)
+        )
+    for row in rows:
+        if in_range(row.get(key)):
+            yield row
+
+
+def file_sha256(filepath, chunk_size=1024 * 1024):
+    """Checksum SHA-256 de un archivo leyendo por bloques"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def meta_path(filepath):
+    """Ruta del sidecar de metadatos de un snapshot"""
+    return f"{filepath}.meta"
+
+
+def write_snapshot_meta(filepath, rows, size=None, sha256=None, **extra):
+    """
+    Guardar el sidecar de un snapshot ya publicado
+
+    Args:
+        filepath: Archivo del snapshot
+        rows: Registros del snapshot
+        size: Bytes del archivo (por defecto se consulta al sistema de archivos)
+        sha256: Checksum (por defecto se calcula leyendo el archivo)
+        extra: Otros campos (compression, key, chunks)
+    """
+    meta = {
+        'rows': rows,
+        'bytes': os.path.getsize(filepath) if size is None else size,
+        'sha256': sha256 or file_sha256(filepath),
+        'extracted_at': datetime.now().isoformat(),
+        **extra,
+    }
+    tmp_path = f"{meta_path(filepath)}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_path, meta_path(filepath))
+    return meta
+
+
+def read_snapshot_meta(filepath):
+    """Leer el sidecar de un snapshot (None si no existe o no es válido)"""
+    try:
+        with open(meta_path(filepath), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if not isinstance(meta, dict) or not {'rows', 'bytes', 'sha256'} <= meta.keys():
+        return None
+    return meta
+
+
+def check_snapshot(filepath, deep=False):
+    """
+    Comprobar si un snapshot existente está completo sin cargarlo
+
+    La comprobación normal solo lee el sidecar y el tamaño del archivo. Con
+    deep=True se recalcula además el checksum. Los snapshots antiguos sin
+    sidecar se recorren una vez y se les crea uno.
+
+    Returns:
+        dict: Metadatos del snapshot, o None si falta o está corrupto
+    """
+    if not os.path.exists(filepath):
+        return None
+
+    meta = read_snapshot_meta(filepath)
+    if meta is None:
+        try:
+            rows = sum(1 for _ in iter_snapshot(filepath))
+        except (json.JSONDecodeError, UnicodeDecodeError, OSError, EOFError):
+            return None
+        return write_snapshot_meta(filepath, rows)
+
+    if os.path.getsize(filepath) != meta['bytes']:
+        return None
+    if deep and file_sha256(filepath) != meta['sha256']:
+        return None
+    return meta
+
+
+def load_json(filepath):
+    """
+    Cargar un archivo de datos de la migración
+
+    Los snapshots (con sidecar) se leen como lista de registros; el resto
+    (mapeos, JSON antiguos) con json.load.
+    """
+    if read_snapshot_meta(filepath) is not None or is_gzip(filepath):
+        return load_snapshot(filepath)
+    with open(filepath, 'r', encoding='utf-8') as f:
+        try:
+            return json.load(f)
+        except json.JSONDecodeError:
+            # NDJSON sin sidecar (extraído antes de existir los .meta)
+            return load_snapshot(filepath)
+
+
+def save_json(data, filepath):
+    """
+    Guardar un archivo de datos de la migración
+
+    Las listas de registros se guardan como snapshot (por bloques, comprimido
+    según SNAPSHOT_COMPRESSION); los diccionarios como JSON normal.
+    """
+    if isinstance(data, list):
+        return write_snapshot(data, filepath)
+
+    directory = os.path.dirname(filepath)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{filepath}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, filepath)
+    # Un JSON normal no es un snapshot: no dejar un sidecar de una versión anterior
+    if os.path.exists(meta_path(filepath)):
+        os.remove(meta_path(filepath))
@@ -0,0 +1,50 @@
+"""
+Tests del extractor remoto (extract/extract_data.py) que no necesitan red
+"""
+import os
+import sys
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from extract.extract_data import OldDBExtractor
+from extract.page_size import PageSizeController
+from extract.retry import RequestExecutor
+
+
+class CountingLimiter:
+    def __init__(self):
+        self.tokens = 0
+
+    def acquire(self):
+        self.tokens += 1
+
+
+def test_retries_take_a_limiter_token_each():
+    extractor = OldDBExtractor()
+    extractor.requests = RequestExecutor(max_attempts=5, base_delay=0, max_delay=0)
+    extractor.limiter = CountingLimiter()
+    calls = []
+
+    def fetch_page(limit):
+        calls.append(limit)
+        if len(calls) < 3:
+            raise httpx.ConnectError('connection refused')
+        return [{'id': 1}]
+
+    batch = extractor.fetch_adaptive(PageSizeController(initial=100, adaptive=False), fetch_page)
+
+    assert batch == [{'id': 1}]
+    assert len(calls) == 3
+    assert extractor.limiter.tokens == 3
+
+
+def test_explicit_limiter_overrides_the_global_one():
+    extractor = OldDBExtractor()
+    extractor.limiter = CountingLimiter()
+    shard_limiter = CountingLimiter()
+
+    extractor.fetch_adaptive(PageSizeController(initial=100, adaptive=False), lambda limit: [], shard_limiter)
+
+    assert shard_limiter.tokens == 1
+    assert extractor.limiter.tokens == 0
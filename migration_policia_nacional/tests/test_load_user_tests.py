@@ -0,0 +1,122 @@
+"""
+Tests de la carga de user_tests y user_test_answers contra Postgres
+
+Se ejecutan solo con TEST_PG_DSN (BD local desechable); las tablas se crean
+en un schema temporal.
+"""
+import os
+import re
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import load_fast
+import load_user_tests_and_answers as loader
+from copy_format import CopyWriter
+from lookup import IdSet
+from snapshot import write_snapshot
+from transform_user_test_answers import COPY_COLUMNS, COPY_CONVERT
+
+reserve_user_test_ids = loader.reserve_user_test_ids
+
+TEST_PG_DSN = os.getenv('TEST_PG_DSN')
+
+
+@pytest.fixture
+def conn():
+    psycopg2 = pytest.importorskip('psycopg2')
+    if not TEST_PG_DSN:
+        pytest.skip('TEST_PG_DSN no configurado')
+
+    schema = f"test_load_{os.getpid()}"
+    admin = psycopg2.connect(TEST_PG_DSN)
+    admin.autocommit = True
+    admin.cursor().execute(f'CREATE SCHEMA "{schema}"')
+    conn = psycopg2.connect(TEST_PG_DSN, options=f'-c search_path="{schema}"')
+    cur = conn.cursor()
+    cur.execute("CREATE TABLE user_tests (id bigserial PRIMARY KEY, user_id bigint)")
+    cur.execute("""
+        CREATE TABLE user_test_answers (
+            id bigserial PRIMARY KEY, user_test_id bigint, question_id bigint,
+            selected_option_id bigint, question_order int, challenge_by_tutor boolean
+        )
+    """)
+    conn.commit()
+    try:
+        yield conn
+    finally:
+        conn.close()
+        admin.cursor().execute(f'DROP SCHEMA "{schema}" CASCADE')
+        admin.close()
+
+
+def next_id(conn):
+    cur = conn.cursor()
+    cur.execute("INSERT INTO user_tests (user_id) VALUES (1) RETURNING id")
+    new_id = cur.fetchone()[0]
+    conn.commit()
+    return new_id
+
+
+def test_reserve_moves_sequence_past_the_block(conn):
+    assert next_id(conn) == 1
+    reserve_user_test_ids(conn, [{'id': 1000 + old_id} for old_id in (5, 2, 40)])
+    # Los tests creados durante la carga quedan fuera del bloque
+    assert next_id(conn) == 1041
+
+
+def test_reserve_refuses_overlapping_block(conn):
+    for _ in range(10):
+        next_id(conn)
+    with pytest.raises(RuntimeError, match='USER_TEST_ID_OFFSET=10'):
+        reserve_user_test_ids(conn, [{'id': old_id} for old_id in range(5, 50)])
+    # Sin reservar: la secuencia sigue donde estaba
+    assert next_id(conn) == 11
+
+
+ANSWERS = [
+    {
+        '_old_id': answer_id, 'user_test_id': 1 + answer_id % 5, 'question_id': answer_id,
+        'selected_option_id': None if answer_id % 4 == 0 else answer_id * 10,
+        'question_order': answer_id, 'challenge_by_tutor': answer_id % 3 == 0,
+    }
+    for answer_id in range(1, 31)
+]
+
+
+def write_answer_files(directory, fmt):
+    for file_num, start in enumerate(range(0, len(ANSWERS), 12), 1):
+        rows = ANSWERS[start:start + 12]
+        path = str(directory / f'user_test_answers_{file_num:04d}.{fmt}')
+        if fmt == 'copy':
+            with CopyWriter(path, COPY_COLUMNS, COPY_CONVERT) as writer:
+                writer.write_rows(rows)
+        else:
+            write_snapshot(rows, path)
+
+
+@pytest.mark.parametrize('fmt, load', [
+    ('copy', load_fast.load_user_test_answers_fast),
+    ('json', load_fast.load_user_test_answers_fast),
+    ('json', loader.load_user_test_answers),
+])
+def test_answers_of_tests_not_inserted_are_skipped(tmp_path, monkeypatch, capsys, conn, fmt, load):
+    write_answer_files(tmp_path, fmt)
+    monkeypatch.setattr(load_fast, 'TRANSFORMED_DIR', str(tmp_path))
+    monkeypatch.setattr(loader, 'TRANSFORMED_DIR', str(tmp_path))
+
+    # El user_test 4 falló al insertarse: no está en la tabla ni en los ids
+    cur = conn.cursor()
+    cur.execute("INSERT INTO user_tests (id, user_id) VALUES (1, 1), (2, 1), (3, 1), (5, 1)")
+    conn.commit()
+    load(conn, IdSet.from_ids([1, 2, 3, 5]))
+
+    cur.execute("""
+        SELECT user_test_id, question_id, selected_option_id, question_order, challenge_by_tutor
+        FROM user_test_answers ORDER BY question_id
+    """)
+    expected = [answer for answer in ANSWERS if answer['user_test_id'] != 4]
+    assert cur.fetchall() == [tuple(answer[column] for column in COPY_COLUMNS) for answer in expected]
+    skipped = re.search(r'omitidos?: ([\d,]+)', capsys.readouterr().out).group(1)
+    assert int(skipped) == len(ANSWERS) - len(expected)
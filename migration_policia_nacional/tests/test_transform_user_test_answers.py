@@ -0,0 +1,171 @@
+"""
+Tests de transform_user_test_answers.py: la ruta por columnas (NumPy) debe
+dar exactamente los mismos registros y rechazos que la de dicts
+"""
+import os
+import random
+import sys
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import transform_user_test_answers as transform
+from lookup import IdMap, IdSet, OptionTable
+from snapshot import iter_snapshot, write_snapshot
+
+OFFSET = 1000000
+
+
+def make_answer_files(directory, complete=False):
+    """
+    Tres snapshots de respuestas antiguas con todos los casos de rechazo
+
+    Con complete=True todas las respuestas traen challenge_by_tutor (como
+    las extraídas con EXTRACT_COLUMNS)
+    """
+    rng = random.Random(7)
+    files = []
+    answer_id = 0
+    for file_num in range(3):
+        rows = []
+        for _ in range(400):
+            answer_id += 1
+            row = {
+                'id': answer_id,
+                'userTestId': rng.choice([None] + list(range(60))),
+                'question': rng.choice([None] + list(range(25))),
+                'answer': rng.choice([None, 0, 1, 2, 3, 4, 5]),
+            }
+            if complete or rng.random() < 0.2:
+                row['challenge_by_tutor'] = rng.choice([True, False, None])
+            rows.append(row)
+        rng.shuffle(rows)  # question_order se calcula por _old_id, no por posición
+        path = str(directory / f'user_test_answers_{file_num + 1:03d}.json')
+        write_snapshot(rows, path)
+        files.append(path)
+    return files
+
+
+def make_transform_args(dense):
+    """Opciones, mapeo de user_tests (denso o con claves) y preguntas válidas"""
+    rng = random.Random(11)
+    options = [
+        (question_id, question_id * 10 + position)
+        for question_id in range(25) for position in range(rng.randrange(0, 5))
+    ]
+    if dense:
+        mapping = {old_id: OFFSET + old_id for old_id in range(50)}
+    else:
+        mapping = {old_id: OFFSET + old_id * 7 for old_id in range(0, 60, 4)}
+    valid_questions = IdSet.from_ids(range(22))
+    return OptionTable.from_rows(options), IdMap.from_items(mapping.items()), valid_questions
+
+
+def read_outputs(directory):
+    return [
+        row
+        for path in sorted(directory.glob('user_test_answers_*.json'))
+        for row in iter_snapshot(str(path))
+    ]
+
+
+@pytest.mark.parametrize('dense', [True, False])
+def test_vectorized_matches_dict_transform(tmp_path, monkeypatch, dense):
+    answer_files = make_answer_files(tmp_path)
+    transform_args = make_transform_args(dense)
+    assert (transform_args[1].base is not None) == dense
+
+    outputs = {}
+    for name, run in (('dict', transform.transform_in_memory), ('vectorized', transform.transform_vectorized)):
+        output_dir = tmp_path / name
+        output_dir.mkdir()
+        monkeypatch.setattr(transform, 'TRANSFORMED_DIR', str(output_dir))
+        count, stats = run(answer_files, transform_args)
+        outputs[name] = (count, stats, read_outputs(output_dir))
+
+    count, stats, rows = outputs['dict']
+    vectorized_count, vectorized_stats, vectorized_rows = outputs['vectorized']
+
+    # El fixture debe cubrir aceptadas y rechazadas
+    assert 0 < count < 1200
+    assert stats['processed'] == 1200 and stats['skipped'] == 1200 - count
+
+    assert vectorized_count == count
+    assert vectorized_stats == stats
+    assert [row['_old_id'] for row in vectorized_rows] == [row['_old_id'] for row in rows]
+    assert [row['user_test_id'] for row in vectorized_rows] == [row['user_test_id'] for row in rows]
+    assert [row['question_order'] for row in vectorized_rows] == [row['question_order'] for row in rows]
+    assert vectorized_rows == rows
+
+
+def test_check_vectorized(tmp_path):
+    assert transform.check_vectorized(make_answer_files(tmp_path), make_transform_args(dense=False))
+
+
+def test_all_modes_write_the_same_output(tmp_path, monkeypatch):
+    answer_files = make_answer_files(tmp_path)
+    transform_args = make_transform_args(dense=True)
+    modes = {
+        'memory': lambda: transform.transform_in_memory(answer_files, transform_args),
+        'streaming': lambda: transform.transform_streaming(answer_files, transform_args, memory_mb=1),
+        'parallel': lambda: transform.transform_parallel(answer_files, transform_args, workers=2),
+        'vectorized': lambda: transform.transform_vectorized(answer_files, transform_args),
+    }
+
+    outputs = {}
+    for name, run in modes.items():
+        output_dir = tmp_path / name
+        output_dir.mkdir()
+        monkeypatch.setattr(transform, 'TRANSFORMED_DIR', str(output_dir))
+        monkeypatch.setattr(transform, 'SPILL_DIR', str(tmp_path / f'spill_{name}'))
+        monkeypatch.setattr(transform, 'ANSWER_MEMORY_BYTES', 3000)  # 1 MB → 4 particiones
+        run()
+        outputs[name] = read_outputs(output_dir)
+
+    rows = outputs['memory']
+    assert rows == sorted(rows, key=transform.answer_sort_key)
+    for name, other in outputs.items():
+        assert other == rows, name
+
+
+def test_spill_buffers_fit_the_memory_budget():
+    partitions = 448  # 50M respuestas con --memory-mb 64
+    buffer_rows = transform.spill_buffer_rows(partitions, 64)
+    assert buffer_rows * partitions * transform.ANSWER_MEMORY_BYTES <= 64 * 1024 * 1024
+    assert buffer_rows < transform.SPILL_BUFFER_ROWS
+    assert transform.spill_buffer_rows(1, 64) == transform.SPILL_BUFFER_ROWS
+    assert transform.spill_buffer_rows(transform.MAX_PARTITIONS, 1) == transform.MIN_SPILL_BUFFER_ROWS
+    assert transform.spill_buffer_rows(4, 0) == transform.SPILL_BUFFER_ROWS
+
+
+@pytest.mark.parametrize('output_format', ['json', 'copy'])
+@pytest.mark.parametrize('complete', [True, False])
+def test_vectorized_writes_the_same_bytes(tmp_path, monkeypatch, output_format, complete):
+    answer_files = make_answer_files(tmp_path, complete)
+    transform_args = make_transform_args(dense=False)
+
+    outputs = {}
+    for name, run in (('dict', transform.transform_in_memory), ('vectorized', transform.transform_vectorized)):
+        output_dir = tmp_path / name
+        output_dir.mkdir()
+        monkeypatch.setattr(transform, 'TRANSFORMED_DIR', str(output_dir))
+        run(answer_files, transform_args, output_format=output_format)
+        outputs[name] = [
+            (path.name, path.read_bytes())
+            for path in sorted(output_dir.glob(f'user_test_answers_*.{output_format}'))
+        ]
+
+    assert outputs['dict']
+    assert outputs['vectorized'] == outputs['dict']
+
+
+def test_code_fingerprint_covers_imported_modules():
+    from transform.incremental import module_sources
+
+    project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sources = [os.path.relpath(path, project_dir) for path in module_sources(transform.__file__)]
+    assert sources[0] == 'transform_user_test_answers.py'
+    for module in ('lookup.py', 'snapshot.py', 'copy_format.py', os.path.join('transform', 'mapping.py')):
+        assert module in sources
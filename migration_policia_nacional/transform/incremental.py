@@ -0,0 +1,234 @@
+"""
+Transformación incremental: cada paso se salta si no ha cambiado nada
+
+Un paso declara sus entradas (archivos o patrones glob), sus salidas, el
+código del que depende (funciones o archivos) y parámetros de config. Al
+terminar bien se guarda en data/transformed/<paso>.state.json la huella de
+todo ello; en la siguiente ejecución el paso solo se repite si cambia alguna
+entrada, el código, los parámetros o si falta o se modificó alguna salida.
+
+La huella de un snapshot sale de su sidecar .meta (sha256 calculado al
+escribirlo), así comprobar un archivo de varios GB no obliga a leerlo; el
+resto de archivos (mapeos JSON) se leen para calcular su sha256.
+
+Uso:
+    step = TransformStep(
+        'questions',
+        inputs=[DATA_FILES['questions']],
+        outputs=[TRANSFORMED_FILES['questions']],
+        code=[transform_questions],
+        params={'academy_id': TARGET_ACADEMY_ID}
+    )
+    step.run(transform_questions, force=args.force)
+
+Un script completo declara como código el propio archivo y los módulos del
+proyecto que importa: code=module_sources(__file__).
+"""
+import ast
+import glob
+import hashlib
+import inspect
+import json
+import os
+import sys
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import TRANSFORMED_DIR
+from snapshot import check_snapshot, file_sha256, meta_path
+from transform.mapping import describe_spec
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def expand_paths(patterns):
+    """Archivos de una lista de rutas y patrones glob (ordenados)"""
+    paths = []
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            paths.extend(sorted(glob.glob(pattern)))
+        else:
+            paths.append(pattern)
+    return paths
+
+
+def file_fingerprint(filepath):
+    """sha256 de un archivo (el del sidecar si es un snapshot), None si no existe"""
+    if not os.path.exists(filepath):
+        return None
+    meta = check_snapshot(filepath) if os.path.exists(meta_path(filepath)) else None
+    if meta is not None:
+        return meta['sha256']
+    return file_sha256(filepath)
+
+
+def code_version(*objects):
+    """
+    Huella del código de un paso
+
+    Args:
+        objects: Funciones/métodos/clases (se usa su código fuente), rutas
+            de archivo (se usa el archivo completo) o specs de transform/mapping.py
+    """
+    digest = hashlib.sha256()
+    for obj in objects:
+        if isinstance(obj, str):
+            with open(obj, 'rb') as f:
+                digest.update(f.read())
+        elif isinstance(obj, dict):
+            digest.update(describe_spec(obj).encode('utf-8'))
+        else:
+            digest.update(inspect.getsource(obj).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def project_module(name):
+    """Archivo del proyecto de un módulo importado (None si es externo)"""
+    base = os.path.join(PROJECT_DIR, *name.split('.'))
+    for candidate in (f"{base}.py", os.path.join(base, '__init__.py')):
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def module_sources(filepath):
+    """
+    Archivos de los que depende el resultado de un script
+
+    Recorre los import del script (y de los módulos que importa) y se queda
+    con los del proyecto: editar lookup.py, snapshot.py, copy_format.py o
+    transform/mapping.py cambia la huella de los pasos que los usan. Se leen
+    los import del código, no sys.modules, así la lista no depende de lo que
+    se haya importado antes.
+
+    Returns:
+        list: El script y después sus módulos del proyecto (ordenados)
+    """
+    script = os.path.abspath(filepath)
+    pending = [script]
+    seen = set()
+    while pending:
+        path = pending.pop()
+        if path in seen:
+            continue
+        seen.add(path)
+        with open(path, 'r', encoding='utf-8') as f:
+            tree = ast.parse(f.read(), path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                # from paquete import módulo: probar también paquete.módulo
+                names = [node.module] + [f"{node.module}.{alias.name}" for alias in node.names]
+            else:
+                continue
+            pending.extend(filter(None, map(project_module, names)))
+    return [script] + sorted(seen - {script})
+
+
+def data_fingerprint(*buffers):
+    """Huella de datos en memoria (ej: arrays de ids leídos de la BD destino)"""
+    digest = hashlib.sha256()
+    for buffer in buffers:
+        digest.update(memoryview(buffer).cast('B'))
+    return digest.hexdigest()
+
+
+class TransformStep:
+    """
+    Paso de transformación con seguimiento de dependencias por contenido
+
+    Args:
+        name: Nombre del paso (archivo de estado <name>.state.json)
+        inputs: Archivos o patrones glob que lee el paso
+        outputs: Archivos o patrones glob que escribe el paso
+        code: Funciones o archivos de los que depende el resultado
+        params: Valores que afectan al resultado (config, huellas de datos
+            que no vienen de archivos); deben poder serializarse en JSON
+    """
+
+    def __init__(self, name, inputs=(), outputs=(), code=(), params=None):
+        self.name = name
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.code = list(code)
+        self.params = params or {}
+        self.path = f"{TRANSFORMED_DIR}/{name}.state.json"
+
+    def fingerprint(self):
+        """Huella actual de entradas, código y parámetros"""
+        return {
+            'inputs': {path: file_fingerprint(path) for path in expand_paths(self.inputs)},
+            'code': code_version(*self.code),
+            'params': hashlib.sha256(
+                json.dumps(self.params, sort_keys=True, default=str).encode('utf-8')
+            ).hexdigest()
+        }
+
+    def output_fingerprint(self):
+        return {path: file_fingerprint(path) for path in expand_paths(self.outputs)}
+
+    def load_state(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def changes(self):
+        """
+        Motivos para repetir el paso (lista vacía si está al día)
+        """
+        state = self.load_state()
+        if state is None:
+            return ['sin ejecución previa']
+
+        current = self.fingerprint()
+        reasons = []
+        changed = sorted(
+            os.path.basename(path)
+            for path in current['inputs'].keys() | state['inputs'].keys()
+            if current['inputs'].get(path) != state['inputs'].get(path)
+        )
+        if changed:
+            reasons.append(f"entradas cambiadas: {', '.join(changed[:5])}"
+                           + (f" (+{len(changed) - 5})" if len(changed) > 5 else ''))
+        if current['code'] != state['code']:
+            reasons.append('código cambiado')
+        if current['params'] != state['params']:
+            reasons.append('parámetros cambiados')
+        if self.output_fingerprint() != state['outputs']:
+            reasons.append('salidas ausentes o modificadas')
+        return reasons
+
+    def record(self, fingerprint):
+        """Guardar la huella de una ejecución correcta (escritura atómica)"""
+        state = dict(fingerprint, outputs=self.output_fingerprint(),
+                     completed_at=datetime.now().isoformat())
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def run(self, fn, *args, force=False, **kwargs):
+        """
+        Ejecutar fn si el paso no está al día
+
+        La huella de las entradas se toma antes de ejecutar, así un archivo
+        que cambia durante la ejecución hace que el paso se repita la próxima vez.
+
+        Returns:
+            tuple: (se ejecutó, resultado de fn o None)
+        """
+        reasons = ['--force'] if force else self.changes()
+        if not reasons:
+            print(f"\n⏭️  {self.name}: sin cambios en entradas ni código, se omite")
+            return False, None
+
+        print(f"\n▶️  {self.name}: {'; '.join(reasons)}")
+        fingerprint = self.fingerprint()
+        result = fn(*args, **kwargs)
+        if result is not False:
+            self.record(fingerprint)
+        return True, result
@@ -0,0 +1,139 @@
+"""
+Mapeos declarativos de campos: registro antiguo → registro nuevo
+
+Cada tabla destino se describe con un dict ordenado {campo_nuevo: regla}:
+
+- Field('isPremium', False): row.get('isPremium', False)
+- Field('id'): row['id'] (sin default el campo es obligatorio)
+- Field('isHidden', False, convert=operator.not_): convert(row.get(...))
+- Const(valor) o un valor suelto (None, 0, '', True...): el mismo en todas las filas
+- RunConst(fn): fn() se evalúa una vez al compilar (ej: NOW, la fecha de la ejecución)
+- Computed(fn): fn(row) para los campos derivados de varios campos; fn puede
+  ser el nombre de una función que se pasa al compilar (ej: si depende de
+  estado del transformador)
+
+compile_mapping genera y compila una vez una función Python con un único
+literal dict (sin recorrer el spec por cada fila). Los defaults y constantes
+son objetos compartidos entre filas: los mutables ([] o {}) no deben
+modificarse después de mapear.
+
+Uso:
+    map_topic = compile_mapping(TOPIC_FIELDS, topic_type_id=self.topic_type_id)
+    new_topics = [map_topic(topic) for topic in old_topics]
+"""
+import inspect
+from datetime import datetime
+
+REQUIRED = object()
+
+
+class Field:
+    """Campo del registro antiguo (con default opcional y conversión)"""
+
+    def __init__(self, source, default=REQUIRED, convert=None):
+        self.source = source
+        self.default = default
+        self.convert = convert
+
+
+class Const:
+    """Valor fijo para todas las filas"""
+
+    def __init__(self, value):
+        self.value = value
+
+
+class RunConst:
+    """Valor calculado una vez por ejecución (al compilar el mapeo)"""
+
+    def __init__(self, fn):
+        self.fn = fn
+
+
+class Computed:
+    """Valor derivado de la fila completa: fn(row)"""
+
+    def __init__(self, fn):
+        self.fn = fn
+
+
+# Fecha de la ejecución (created_at/updated_at de los registros nuevos)
+NOW = RunConst(lambda: datetime.now().isoformat())
+
+
+def compile_mapping(spec, name='map_row', **functions):
+    """
+    Compilar un spec a una función row -> dict
+
+    Args:
+        spec: dict ordenado {campo_nuevo: regla}
+        name: Nombre de la función generada (aparece en los tracebacks)
+        functions: Funciones de los Computed que se indican por nombre
+
+    Returns:
+        function: map_row(row) -> dict con los campos en el orden del spec
+            (el código generado queda en map_row.source)
+    """
+    namespace = {}
+    fields = []
+
+    def bind(prefix, value):
+        key = f"{prefix}{len(namespace)}"
+        namespace[key] = value
+        return key
+
+    def resolve(value):
+        return value.fn() if isinstance(value, RunConst) else value
+
+    for target, rule in spec.items():
+        if isinstance(rule, Field):
+            if rule.default is REQUIRED:
+                expr = f"row[{rule.source!r}]"
+            else:
+                expr = f"get({rule.source!r}, {bind('default', resolve(rule.default))})"
+            if rule.convert is not None:
+                expr = f"{bind('convert', rule.convert)}({expr})"
+        elif isinstance(rule, Computed):
+            fn = functions[rule.fn] if isinstance(rule.fn, str) else rule.fn
+            expr = f"{bind('computed', fn)}(row)"
+        elif isinstance(rule, Const):
+            expr = bind('const', rule.value)
+        else:
+            expr = bind('const', resolve(rule))
+        fields.append(f"        {target!r}: {expr},")
+
+    source = "\n".join([
+        f"def {name}(row):",
+        "    get = row.get",
+        "    return {",
+        *fields,
+        "    }",
+    ])
+    exec(compile(source, f"<mapping {name}>", 'exec'), namespace)
+    map_row = namespace[name]
+    map_row.source = source
+    return map_row
+
+
+def describe_spec(spec):
+    """
+    Texto estable de un spec (para la huella de código de transform/incremental):
+    reglas y código fuente de sus funciones, sin direcciones de memoria
+    """
+    def describe(value):
+        if value is REQUIRED:
+            return 'REQUIRED'
+        if isinstance(value, Field):
+            return f"Field({value.source!r}, {describe(value.default)}, {describe(value.convert)})"
+        if isinstance(value, (Computed, RunConst)):
+            return f"{type(value).__name__}({describe(value.fn)})"
+        if isinstance(value, Const):
+            return f"Const({describe(value.value)})"
+        if callable(value):
+            try:
+                return inspect.getsource(value).strip()
+            except (OSError, TypeError):
+                return getattr(value, '__qualname__', repr(value))
+        return repr(value)
+
+    return "\n".join(f"{target!r}: {describe(rule)}" for target, rule in spec.items())
@@ -2,7 +2,9 @@
 Transforma datos de la estructura antigua a la nueva
 Aplica mapeos, conversiones y crea nuevas estructuras
 """
+import argparse
 import json
+import operator
 import sys
 import os
 from datetime import datetime
@@ -13,17 +15,137 @@ from config import (
     DATA_FILES, TRANSFORMED_FILES, TOPIC_TYPES,
     TARGET_ACADEMY_ID, TARGET_SPECIALTY_ID
 )
+from snapshot import iter_snapshot, load_json as load_data_file, save_json as save_data_file
+from transform.incremental import TransformStep, module_sources
+from transform.mapping import Field, Computed, NOW, compile_mapping
+
+# Mapeos de campos por tabla destino (ver transform/mapping.py)
+TOPIC_FIELDS = {
+    'id': Field('id'),
+    'topic_type_id': Computed('topic_type_id'),
+    'topic_name': Field('name'),
+    'description': None,
+    'enabled': Field('isHidden', False, convert=operator.not_),
+    'is_premium': Field('isPremium', False),
+    'is_hidden_but_premium': Computed(lambda topic: topic.get('isHidden', False) and topic.get('isPremium', False)),
+    'published_at': NOW,
+    'total_participants': 0,
+    'total_questions': Field('questions', 0),
+    'total_score': 0,
+    'created_at': NOW,
+    'updated_at': NOW,
+    'options': Field('options', 3),
+    'max_score': 0,
+    'min_score': 0,
+    'academy_id': TARGET_ACADEMY_ID,
+    'duration_seconds': Field('minutes', 0, convert=lambda minutes: (minutes or 0) * 60),
+    'image_url': None,
+    'order': 100,  # Temporal, se calculará después
+    'category_id': Field('category', None),
+    'specialty_id': TARGET_SPECIALTY_ID,
+    'topic_group_id': None,
+    'group_order': None
+}
+
+QUESTION_FIELDS = {
+    'id': Field('id'),
+    'question': Field('question'),
+    'tip': Field('tip', ''),
+    'topic': Field('topic'),
+    'article': Field('article', None),
+    'question_image_url': '',  # TODO: mapear si image=true
+    'retro_image_url': '',     # TODO: mapear si retro_image=true
+    'retro_audio_enable': Field('retro_audio', False),
+    'retro_audio_text': Field('retro_text', ''),
+    'retro_audio_url': '',
+    'order': Field('calculated_order', 0),
+    'published': Field('publised', True),
+    'shuffled': Field('shuffled', False),
+    'num_answered': Field('num_answered', 0),
+    'num_fails': Field('num_fails', 0),
+    'num_empty': Field('num_empty', 0),
+    'created_at': NOW,
+    'updated_at': NOW,
+    'created_by': None,  # TODO: mapear si existe
+    'challenge_by_tutor': Field('challenge_by_tutor', False),
+    'challenge_reason': Field('challenge_reason', None),
+    'academy_id': TARGET_ACADEMY_ID
+}
+
+USER_FIELDS = {
+    'id': Field('id'),
+    'username': Field('username'),
+    'email': None,
+    'first_name': None,
+    'last_name': None,
+    'phone': None,
+    'totalQuestions': Field('totalQuestions', 0),
+    'rightQuestions': Field('rightQuestions', 0),
+    'wrongQuestions': Field('wrongQuestions', 0),
+    'tester': False,
+    'lastUsed': None,
+    'fcm_token': None,
+    'fid_token': None,
+    'profile_image': None,
+    'unlocked_at': None,
+    'unlock_duration_minutes': 0,
+    'enabled': Field('enabled', True),
+    'tutorial': False,
+    'createdAt': Field('createdAt', None),
+    'updatedAt': Field('updatedAt', None),
+    'wordpress_user_id': None,
+    'display_name': None,
+    'academy_id': TARGET_ACADEMY_ID,
+    'specialty_id': TARGET_SPECIALTY_ID,
+    'question_goal': Field('goal', 50),
+    'deleted': False,
+    'deleted_at': None
+}
+
+USER_TEST_FIELDS = {
+    'id': Field('id'),
+    'user_id': Field('userId'),
+    'topic_ids': Field('topics', []),
+    'options': Field('options', 4),
+    'right_questions': Field('rightQuestions', 0),
+    'wrong_questions': Field('wrongQuestions', 0),
+    'question_count': Computed(lambda test: len(test.get('questions', []))),
+    'total_answered': Computed(lambda test: test.get('rightQuestions', 0) + test.get('wrongQuestions', 0)),
+    'score': None,
+    'finalized': Field('finalized', False),
+    'visible': True,
+    'study_mode': Field('studyMode', False),
+    'study_failed': Field('studyFailed', False),
+    'study_white': Field('studyWhite', False),
+    'mock': None,
+    'survival': False,
+    'mark_collection': None,
+    'minutes': Field('minutes', None),
+    'time_spent_millis': Field('timeSpentMillis', None),
+    'special_topic': Field('specialTopic', None),
+    'special_topic_title': None,
+    'difficulty_end': None,
+    'number_of_lives': 0,
+    'created_at': NOW,
+    'updated_at': Field('updatedAt', None),
+    'is_flashcard_mode': False,
+    'duration_seconds': Field('minutes', 0, convert=lambda minutes: (minutes or 0) * 60),
+    'topic_group_id': None
+}
 
 class DataTransformer:
     def __init__(self):
-        self.topic_type_map = {}  # topic_type_name -> id
+        # topic_type_name -> id (mismos ids que transform_topic_types, así
+        # categories y topics no dependen de que ese paso se haya ejecutado)
+        self.topic_type_map = {
+            tt['topic_type_name']: idx for idx, tt in enumerate(TOPIC_TYPES, start=1)
+        }
         self.question_options_map = {}  # question_id -> [option_ids]
 
     def load_json(self, filepath):
         """Cargar datos de archivo JSON"""
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return load_data_file(filepath)
         except FileNotFoundError:
             print(f"⚠️ Archivo no encontrado: {filepath}")
             return []
@@ -31,11 +153,24 @@ class DataTransformer:
             print(f"✗ Error decodificando JSON en {filepath}: {e}")
             return []
 
+    def iter_raw(self, filepath):
+        """Leer un snapshot extraído (NDJSON) registro a registro"""
+        if not os.path.exists(filepath):
+            print(f"⚠️ Archivo no encontrado: {filepath}")
+            return iter(())
+        return iter_snapshot(filepath)
+
+    def load_raw(self, filepath):
+        """Cargar un snapshot extraído completo en memoria"""
+        try:
+            return list(self.iter_raw(filepath))
+        except json.JSONDecodeError as e:
+            print(f"✗ Error decodificando JSON en {filepath}: {e}")
+            return []
+
     def save_json(self, data, filepath):
-        """Guardar datos a archivo JSON"""
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        """Guardar datos (listas como snapshot por bloques, diccionarios como JSON)"""
+        save_data_file(data, filepath)
 
     def determine_topic_type_name(self, topic):
         """
@@ -62,6 +197,10 @@ class DataTransformer:
         else:
             return 'Simulacros'
 
+    def topic_type_id(self, topic):
+        """Id del topic_type de un topic antiguo"""
+        return self.topic_type_map[self.determine_topic_type_name(topic)]
+
     def transform_topic_types(self):
         """
         Crear topic_types (no existen en BD antigua)
@@ -98,7 +237,7 @@ class DataTransformer:
         """
         print("\n📁 Transformando categories...")
 
-        old_categories = self.load_json(DATA_FILES['categories'])
+        old_categories = self.load_raw(DATA_FILES['categories'])
         new_categories = []
 
         # Por defecto asignar topic_type "Bloque de Temario"
@@ -128,42 +267,11 @@ class DataTransformer:
         """
         print("\n🎯 Transformando topics...")
 
-        old_topics = self.load_json(DATA_FILES['topics'])
-        new_topics = []
+        old_topics = self.load_raw(DATA_FILES['topics'])
+        map_topic = compile_mapping(TOPIC_FIELDS, 'map_topic', topic_type_id=self.topic_type_id)
 
         # Primera pasada: crear topics con order temporal
-        for topic in tqdm(old_topics, desc="   Procesando topics"):
-            # Determinar topic_type
-            topic_type_name = self.determine_topic_type_name(topic)
-            topic_type_id = self.topic_type_map[topic_type_name]
-
-            new_topic = {
-                'id': topic['id'],
-                'topic_type_id': topic_type_id,
-                'topic_name': topic['name'],
-                'description': None,
-                'enabled': not topic.get('isHidden', False),
-                'is_premium': topic.get('isPremium', False),
-                'is_hidden_but_premium': topic.get('isHidden', False) and topic.get('isPremium', False),
-                'published_at': datetime.now().isoformat(),
-                'total_participants': 0,
-                'total_questions': topic.get('questions', 0),
-                'total_score': 0,
-                'created_at': datetime.now().isoformat(),
-                'updated_at': datetime.now().isoformat(),
-                'options': topic.get('options', 3),
-                'max_score': 0,
-                'min_score': 0,
-                'academy_id': TARGET_ACADEMY_ID,
-                'duration_seconds': (topic.get('minutes', 0) or 0) * 60,
-                'image_url': None,
-                'order': 100,  # Temporal, se calculará después
-                'category_id': topic.get('category'),
-                'specialty_id': TARGET_SPECIALTY_ID,
-                'topic_group_id': None,
-                'group_order': None
-            }
-            new_topics.append(new_topic)
+        new_topics = [map_topic(topic) for topic in tqdm(old_topics, desc="   Procesando topics")]
 
         # Segunda pasada: calcular order correcto
         # Agrupar por topic_type_id y ordenar por id
@@ -197,7 +305,7 @@ class DataTransformer:
         """
         print("\n❓ Transformando questions...")
 
-        old_questions = self.load_json(DATA_FILES['questions'])
+        old_questions = self.load_raw(DATA_FILES['questions'])
         new_questions = []
         question_options_map = {}  # question_id → [{order, answer, is_correct}]
 
@@ -213,36 +321,14 @@ class DataTransformer:
             for idx, question in enumerate(questions, start=1):
                 question['calculated_order'] = idx
 
+        map_question = compile_mapping(QUESTION_FIELDS, 'map_question')
+
         for q in tqdm(old_questions, desc="   Procesando questions"):
             # Determinar número de opciones (3 o 4)
             num_options = 3 if not q.get('answer4') else 4
 
             # Transformar question (solo metadatos)
-            new_q = {
-                'id': q['id'],
-                'question': q['question'],
-                'tip': q.get('tip', ''),
-                'topic': q['topic'],
-                'article': q.get('article'),
-                'question_image_url': '',  # TODO: mapear si image=true
-                'retro_image_url': '',     # TODO: mapear si retro_image=true
-                'retro_audio_enable': q.get('retro_audio', False),
-                'retro_audio_text': q.get('retro_text', ''),
-                'retro_audio_url': '',
-                'order': q.get('calculated_order', 0),
-                'published': q.get('publised', True),
-                'shuffled': q.get('shuffled', False),
-                'num_answered': q.get('num_answered', 0),
-                'num_fails': q.get('num_fails', 0),
-                'num_empty': q.get('num_empty', 0),
-                'created_at': datetime.now().isoformat(),
-                'updated_at': datetime.now().isoformat(),
-                'created_by': None,  # TODO: mapear si existe
-                'challenge_by_tutor': q.get('challenge_by_tutor', False),
-                'challenge_reason': q.get('challenge_reason'),
-                'academy_id': TARGET_ACADEMY_ID
-            }
-            new_questions.append(new_q)
+            new_questions.append(map_question(q))
 
             # Guardar contenido de opciones para actualizar después
             # El trigger creará las opciones vacías, nosotros las actualizaremos
@@ -278,40 +364,9 @@ class DataTransformer:
         """
         print("\n👥 Transformando users...")
 
-        old_users = self.load_json(DATA_FILES['users'])
-        new_users = []
-
-        for user in tqdm(old_users, desc="   Procesando users"):
-            new_user = {
-                'id': user['id'],
-                'username': user['username'],
-                'email': None,
-                'first_name': None,
-                'last_name': None,
-                'phone': None,
-                'totalQuestions': user.get('totalQuestions', 0),
-                'rightQuestions': user.get('rightQuestions', 0),
-                'wrongQuestions': user.get('wrongQuestions', 0),
-                'tester': False,
-                'lastUsed': None,
-                'fcm_token': None,
-                'fid_token': None,
-                'profile_image': None,
-                'unlocked_at': None,
-                'unlock_duration_minutes': 0,
-                'enabled': user.get('enabled', True),
-                'tutorial': False,
-                'createdAt': user.get('createdAt'),
-                'updatedAt': user.get('updatedAt'),
-                'wordpress_user_id': None,
-                'display_name': None,
-                'academy_id': TARGET_ACADEMY_ID,
-                'specialty_id': TARGET_SPECIALTY_ID,
-                'question_goal': user.get('goal', 50),
-                'deleted': False,
-                'deleted_at': None
-            }
-            new_users.append(new_user)
+        old_users = self.iter_raw(DATA_FILES['users'])
+        map_user = compile_mapping(USER_FIELDS, 'map_user')
+        new_users = [map_user(user) for user in tqdm(old_users, desc="   Procesando users")]
 
         self.save_json(new_users, TRANSFORMED_FILES['users'])
         print(f"   ✓ {len(new_users)} users transformados")
@@ -324,50 +379,30 @@ class DataTransformer:
         """
         print("\n📝 Transformando user_tests...")
 
-        old_tests = self.load_json(DATA_FILES['user_tests'])
-        new_tests = []
-
-        for test in tqdm(old_tests, desc="   Procesando user_tests"):
-            # Calcular campos derivados
-            question_count = len(test.get('questions', []))
-            total_answered = test.get('rightQuestions', 0) + test.get('wrongQuestions', 0)
-
-            new_test = {
-                'id': test['id'],
-                'user_id': test['userId'],
-                'topic_ids': test.get('topics', []),
-                'options': test.get('options', 4),
-                'right_questions': test.get('rightQuestions', 0),
-                'wrong_questions': test.get('wrongQuestions', 0),
-                'question_count': question_count,
-                'total_answered': total_answered,
-                'score': None,
-                'finalized': test.get('finalized', False),
-                'visible': True,
-                'study_mode': test.get('studyMode', False),
-                'study_failed': test.get('studyFailed', False),
-                'study_white': test.get('studyWhite', False),
-                'mock': None,
-                'survival': False,
-                'mark_collection': None,
-                'minutes': test.get('minutes'),
-                'time_spent_millis': test.get('timeSpentMillis'),
-                'special_topic': test.get('specialTopic'),
-                'special_topic_title': None,
-                'difficulty_end': None,
-                'number_of_lives': 0,
-                'created_at': datetime.now().isoformat(),
-                'updated_at': test.get('updatedAt'),
-                'is_flashcard_mode': False,
-                'duration_seconds': (test.get('minutes', 0) or 0) * 60,
-                'topic_group_id': None
-            }
-            new_tests.append(new_test)
+        old_tests = self.iter_raw(DATA_FILES['user_tests'])
+        map_user_test = compile_mapping(USER_TEST_FIELDS, 'map_user_test')
+        new_tests = [map_user_test(test) for test in tqdm(old_tests, desc="   Procesando user_tests")]
 
         self.save_json(new_tests, TRANSFORMED_FILES['user_tests'])
         print(f"   ✓ {len(new_tests)} user_tests transformados")
         return new_tests
 
+    def build_question_positions(self, questions):
+        """
+        Posición de cada pregunta en el array questions de un test
+
+        Si una pregunta aparece repetida se queda la primera posición (lo mismo
+        que devolvía list.index), así el resultado no depende del orden de las respuestas.
+
+        Returns:
+            dict: question_id -> posición (0-indexed)
+        """
+        positions = {}
+        if isinstance(questions, list):
+            for position, question_id in enumerate(questions):
+                positions.setdefault(question_id, position)
+        return positions
+
     def transform_user_test_answers(self):
         """
         Transformar user_test_answers
@@ -377,11 +412,14 @@ class DataTransformer:
         """
         print("\n✍️ Transformando user_test_answers...")
 
-        old_answers = self.load_json(DATA_FILES['user_test_answers'])
-        old_tests = self.load_json(DATA_FILES['user_tests'])
+        old_answers = self.iter_raw(DATA_FILES['user_test_answers'])
+        old_tests = self.iter_raw(DATA_FILES['user_tests'])
 
-        # Crear índice de tests para obtener el orden de las preguntas
-        tests_index = {t['id']: t for t in old_tests}
+        # Índice test -> {question_id: posición}, construido una vez por test
+        # (en lugar de test['questions'].index() por cada respuesta)
+        question_positions = {
+            t['id']: self.build_question_positions(t.get('questions')) for t in old_tests
+        }
 
         new_answers = []
 
@@ -399,13 +437,8 @@ class DataTransformer:
                 selected_option_id = question_options[answer_num - 1]
 
             # Calcular question_order del array questions del test
-            test = tests_index.get(ans['userTestId'])
-            question_order = 0
-            if test and 'questions' in test:
-                try:
-                    question_order = test['questions'].index(question_id)
-                except ValueError:
-                    question_order = 0
+            positions = question_positions.get(ans['userTestId'])
+            question_order = positions.get(question_id, 0) if positions else 0
 
             new_ans = {
                 'id': ans['id'],
@@ -437,7 +470,7 @@ class DataTransformer:
         """
         print("\n⭐ Transformando user_favorite_questions...")
 
-        old_favs = self.load_json(DATA_FILES['user_favorite_questions'])
+        old_favs = self.iter_raw(DATA_FILES['user_favorite_questions'])
         new_favs = []
 
         for fav in tqdm(old_favs, desc="   Procesando favorites"):
@@ -453,8 +486,56 @@ class DataTransformer:
         print(f"   ✓ {len(new_favs)} user_favorite_questions transformados")
         return new_favs
 
-    def transform_all(self):
-        """Ejecutar todas las transformaciones"""
+    def transform_steps(self):
+        """
+        Pasos de transform_all en orden, con sus entradas, salidas y código
+
+        Returns:
+            list: (TransformStep, método que lo ejecuta)
+        """
+        target = {'academy_id': TARGET_ACADEMY_ID, 'specialty_id': TARGET_SPECIALTY_ID}
+        # Módulos importados (snapshot.py, transform/mapping.py...); este archivo va por métodos
+        shared = module_sources(__file__)[1:]
+        return [
+            (TransformStep(
+                'topic_types',
+                outputs=[TRANSFORMED_FILES['topic_types']],
+                code=[DataTransformer.transform_topic_types, *shared],
+                params={'topic_types': TOPIC_TYPES}
+            ), self.transform_topic_types),
+            (TransformStep(
+                'categories',  # Necesario para FK de topics
+                inputs=[DATA_FILES['categories']],
+                outputs=[TRANSFORMED_FILES['categories']],
+                code=[DataTransformer.transform_categories, *shared],
+                params={'topic_types': TOPIC_TYPES}
+            ), self.transform_categories),
+            (TransformStep(
+                'topics',
+                inputs=[DATA_FILES['topics']],
+                outputs=[TRANSFORMED_FILES['topics']],
+                code=[
+                    DataTransformer.transform_topics, DataTransformer.determine_topic_type_name,
+                    DataTransformer.topic_type_id, TOPIC_FIELDS, compile_mapping, *shared
+                ],
+                params={'topic_types': TOPIC_TYPES, **target}
+            ), self.transform_topics),
+            (TransformStep(
+                'questions',
+                inputs=[DATA_FILES['questions']],
+                outputs=[TRANSFORMED_FILES['questions'], TRANSFORMED_FILES['question_options']],
+                code=[DataTransformer.transform_questions, QUESTION_FIELDS, compile_mapping, *shared],
+                params=target
+            ), self.transform_questions),
+        ]
+
+    def transform_all(self, force=False):
+        """
+        Ejecutar todas las transformaciones
+
+        Cada paso se omite si sus entradas, su código y sus salidas no han
+        cambiado desde la última ejecución (force=True repite todos).
+        """
         print("\n" + "="*60)
         print("🔄 TRANSFORMACIÓN DE DATOS")
         print("="*60)
@@ -463,10 +544,11 @@ class DataTransformer:
 
         try:
             # Orden de transformaciones
-            self.transform_topic_types()
-            self.transform_categories()  # Necesario para FK de topics
-            self.transform_topics()
-            self.transform_questions()  # NUEVO: Transformar questions
+            skipped = []
+            for step, transform in self.transform_steps():
+                ran, _ = step.run(transform, force=force)
+                if not ran:
+                    skipped.append(step.name)
 
             # TODO: Pendientes de compatibilizar
             # self.transform_users()
@@ -477,6 +559,8 @@ class DataTransformer:
             print("\n" + "="*60)
             print("✓ TRANSFORMACIÓN COMPLETADA")
             print("   ✓ topic_types, categories, topics y questions transformados")
+            if skipped:
+                print(f"   ⏭️  Sin cambios (omitidos): {', '.join(skipped)}")
             print("   ⏸️  Pendientes: users, tests, answers...")
             print("="*60)
             return True
@@ -489,8 +573,13 @@ class DataTransformer:
 
 def main():
     """Función principal"""
+    parser = argparse.ArgumentParser(description='Transformar datos generales')
+    parser.add_argument('--force', action='store_true',
+                        help='Repetir todos los pasos aunque no hayan cambiado')
+    args = parser.parse_args()
+
     transformer = DataTransformer()
-    success = transformer.transform_all()
+    success = transformer.transform_all(force=args.force)
     sys.exit(0 if success else 1)
 
 if __name__ == '__main__':
@@ -3,83 +3,117 @@
 Transforma flashcards a la nueva estructura
 - flash_cards_stack → topics
 - flashcard → questions con 2 opciones
+
+Los ids nuevos se asignan aquí (ID_OFFSET + id antiguo, tanto topics como
+questions): la carga no necesita RETURNING ni completar el mapeo de stacks.
 """
-import json
-from datetime import datetime
 from tqdm import tqdm
+import argparse
 import sys
 import os
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from config import DATA_FILES, TRANSFORMED_FILES, TARGET_ACADEMY_ID
+from snapshot import load_snapshot, save_json
+from transform.incremental import TransformStep, module_sources
+from transform.mapping import Field, Computed, NOW, compile_mapping
+
+# Offset de ids de los topics y questions de flashcards (30000000+), para no
+# chocar con los topics y questions normales (que conservan su id antiguo)
+ID_OFFSET = 30000000
+
+def flashcard_id(old_id):
+    return ID_OFFSET + old_id
+
+# Mapeos de campos (ver transform/mapping.py)
+FLASHCARD_TOPIC_FIELDS = {
+    'id': Field('id', convert=flashcard_id),
+    'topic_type_id': None,  # Se asignará después de crear topic_type "Flashcards"
+    'topic_name': Computed(lambda stack: stack.get('name', f"Flashcard Stack {stack['id']}")),
+    'description': '',
+    'enabled': True,
+    'is_premium': False,
+    'is_hidden_but_premium': False,
+    'published_at': NOW,
+    'total_participants': 0,
+    'total_questions': Field('num_cards', 0),
+    'total_score': 0,
+    'options': 2,  # ✅ Flashcards siempre tienen 2 opciones
+    'max_score': 0,
+    'min_score': 0,
+    'academy_id': Field('academy', TARGET_ACADEMY_ID),
+    'duration_seconds': 0,
+    'image_url': None,
+    'order': None,  # Orden secuencial, se asigna al recorrer los stacks ordenados
+    'category_id': None,
+    'specialty_id': None,
+    'topic_group_id': None,
+    'group_order': None,
+    'created_at': Field('created_at', NOW),
+    'updated_at': NOW
+}
+
+FLASHCARD_QUESTION_FIELDS = {
+    'id': Field('id', convert=flashcard_id),
+    'question': Field('flash_card_question', ''),  # Pregunta/Front
+    'tip': '',
+    'topic': Field('flash_card_stack', convert=flashcard_id),  # id nuevo del topic del stack
+    'article': None,
+    'question_image_url': '',
+    'retro_image_url': '',
+    'retro_audio_enable': False,
+    'retro_audio_text': '',
+    'retro_audio_url': '',
+    'order': Field('order', 0),
+    'published': True,
+    'shuffled': False,  # ✅ NO mezclar flashcards
+    'num_answered': 0,
+    'num_fails': 0,
+    'num_empty': 0,
+    'challenge_by_tutor': False,
+    'challenge_reason': None,
+    'academy_id': TARGET_ACADEMY_ID,
+    'created_by': None,
+    'created_at': Field('created_at', NOW),
+    'updated_at': NOW
+}
 
 def load_json(filepath):
-    """Cargar JSON"""
+    """Cargar snapshot extraído (NDJSON o JSON antiguo)"""
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return load_snapshot(filepath)
     except FileNotFoundError:
         print(f"⚠️ Archivo no encontrado: {filepath}")
         return []
 
-def save_json(data, filepath):
-    """Guardar JSON"""
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-
 def transform_stacks_to_topics(stacks):
     """
     Transformar flash_cards_stack → topics
 
-    NO usar el ID original del stack, dejar que se autogenere
-    Guardar mapeo old_stack_id → nuevo_topic_id para usarlo en flashcards
+    id del topic: ID_OFFSET + id del stack
+    Guardar mapeo old_stack_id → new_topic_id (referencia)
     """
     print("\n🎯 Transformando stacks → topics...")
 
     topics = []
-    stack_mapping = {}  # {old_stack_id: nuevo_topic_id} - se completará después de INSERT
+    stack_mapping = {}  # {old_stack_id: {..., new_topic_id}}
 
     # Ordenar por ID para mantener consistencia
     stacks_sorted = sorted(stacks, key=lambda x: x['id'])
 
+    map_topic = compile_mapping(FLASHCARD_TOPIC_FIELDS, 'map_flashcard_topic')
+
     for idx, stack in enumerate(tqdm(stacks_sorted, desc="   Transformando stacks"), start=1):
-        topic = {
-            # NO incluir 'id' - se autogenerará en la BD
-            # Pero guardar el old_id para el mapeo posterior
-            'old_stack_id': stack['id'],  # Para referencia temporal
-            'topic_type_id': None,  # Se asignará después de crear topic_type "Flashcards"
-            'topic_name': stack.get('name', f"Flashcard Stack {stack['id']}"),
-            'description': '',
-            'enabled': True,
-            'is_premium': False,
-            'is_hidden_but_premium': False,
-            'published_at': datetime.now().isoformat(),
-            'total_participants': 0,
-            'total_questions': stack.get('num_cards', 0),
-            'total_score': 0,
-            'options': 2,  # ✅ Flashcards siempre tienen 2 opciones
-            'max_score': 0,
-            'min_score': 0,
-            'academy_id': stack.get('academy', TARGET_ACADEMY_ID),
-            'duration_seconds': 0,
-            'image_url': None,
-            'order': idx,  # Orden secuencial
-            'category_id': None,
-            'specialty_id': None,
-            'topic_group_id': None,
-            'group_order': None,
-            'created_at': stack.get('created_at', datetime.now().isoformat()),
-            'updated_at': datetime.now().isoformat()
-        }
+        topic = map_topic(stack)
+        topic['order'] = idx  # Orden secuencial
 
         topics.append(topic)
 
-        # Guardar mapeo temporal (se completará después del INSERT)
         stack_mapping[stack['id']] = {
             'old_stack_id': stack['id'],
             'stack_name': stack.get('name', f"Stack {stack['id']}"),
             'num_cards': stack.get('num_cards', 0),
-            'new_topic_id': None  # Se completará después del INSERT
+            'new_topic_id': topic['id']
         }
 
     print(f"   ✓ {len(topics)} topics de flashcards transformados")
@@ -97,43 +131,19 @@ def transform_flashcards_to_questions(flashcards, stack_mapping):
     questions = []
     options_map = {}  # {question_id: [{order, answer, is_correct}]}
 
-    # Usar offset alto para IDs de flashcards (30000000+)
-    ID_OFFSET = 30000000
+    map_question = compile_mapping(FLASHCARD_QUESTION_FIELDS, 'map_flashcard_question')
 
     for fc in tqdm(flashcards, desc="   Transformando flashcards"):
-        question_id = ID_OFFSET + fc['id']
+        question_id = flashcard_id(fc['id'])
 
-        # Obtener topic_id del mapeo (por ahora usamos old_stack_id, se actualizará después)
+        # Solo flashcards de stacks existentes
         old_stack_id = fc.get('flash_card_stack')
 
         if old_stack_id not in stack_mapping:
             print(f"\n   ⚠️ Flashcard {fc['id']} tiene stack_id={old_stack_id} que no existe en stacks")
             continue
 
-        question = {
-            'id': question_id,
-            'question': fc.get('flash_card_question', ''),  # Pregunta/Front
-            'tip': '',
-            'topic': old_stack_id,  # TEMPORAL: Se actualizará después con new_topic_id
-            'article': None,
-            'question_image_url': '',
-            'retro_image_url': '',
-            'retro_audio_enable': False,
-            'retro_audio_text': '',
-            'retro_audio_url': '',
-            'order': fc.get('order', 0),
-            'published': True,
-            'shuffled': False,  # ✅ NO mezclar flashcards
-            'num_answered': 0,
-            'num_fails': 0,
-            'num_empty': 0,
-            'challenge_by_tutor': False,
-            'challenge_reason': None,
-            'academy_id': TARGET_ACADEMY_ID,
-            'created_by': None,
-            'created_at': fc.get('created_at', datetime.now().isoformat()),
-            'updated_at': datetime.now().isoformat()
-        }
+        question = map_question(fc)
 
         questions.append(question)
 
@@ -158,41 +168,67 @@ def transform_flashcards_to_questions(flashcards, stack_mapping):
 
     return questions, options_map
 
+def transform_and_save():
+    """Cargar, transformar y guardar flashcards"""
+    # Cargar datos
+    stacks = load_json(DATA_FILES['flash_cards_stack'])
+    flashcards = load_json(DATA_FILES['flashcards'])
+
+    print(f"\n📊 Datos cargados:")
+    print(f"   - {len(stacks)} flash_cards_stacks")
+    print(f"   - {len(flashcards)} flashcards")
+
+    # Transformar stacks → topics
+    topics, stack_mapping = transform_stacks_to_topics(stacks)
+
+    # Transformar flashcards → questions
+    questions, options_map = transform_flashcards_to_questions(flashcards, stack_mapping)
+
+    # Guardar
+    save_json(topics, TRANSFORMED_FILES['flashcard_topics'])
+    save_json(questions, TRANSFORMED_FILES['flashcard_questions'])
+    save_json(options_map, TRANSFORMED_FILES['flashcard_options'])
+    save_json(stack_mapping, TRANSFORMED_FILES['flashcard_stack_mapping'])
+
+    return len(topics), len(questions)
+
 def main():
     """Función principal"""
+    parser = argparse.ArgumentParser(description='Transformar flashcards')
+    parser.add_argument('--force', action='store_true',
+                        help='Transformar aunque entradas y código no hayan cambiado')
+    args = parser.parse_args()
+
     print("\n" + "="*60)
     print("🔄 TRANSFORMACIÓN DE FLASHCARDS")
     print("="*60)
 
     try:
-        # Cargar datos
-        stacks = load_json(DATA_FILES['flash_cards_stack'])
-        flashcards = load_json(DATA_FILES['flashcards'])
-
-        print(f"\n📊 Datos cargados:")
-        print(f"   - {len(stacks)} flash_cards_stacks")
-        print(f"   - {len(flashcards)} flashcards")
-
-        # Transformar stacks → topics
-        topics, stack_mapping = transform_stacks_to_topics(stacks)
-
-        # Transformar flashcards → questions
-        questions, options_map = transform_flashcards_to_questions(flashcards, stack_mapping)
-
-        # Guardar
-        save_json(topics, TRANSFORMED_FILES['flashcard_topics'])
-        save_json(questions, TRANSFORMED_FILES['flashcard_questions'])
-        save_json(options_map, TRANSFORMED_FILES['flashcard_options'])
-        save_json(stack_mapping, TRANSFORMED_FILES['flashcard_stack_mapping'])
+        step = TransformStep(
+            'flashcards',
+            inputs=[DATA_FILES['flash_cards_stack'], DATA_FILES['flashcards']],
+            outputs=[
+                TRANSFORMED_FILES['flashcard_topics'], TRANSFORMED_FILES['flashcard_questions'],
+                TRANSFORMED_FILES['flashcard_options'], TRANSFORMED_FILES['flashcard_stack_mapping']
+            ],
+            code=module_sources(__file__),
+            params={'academy_id': TARGET_ACADEMY_ID}
+        )
+        ran, result = step.run(transform_and_save, force=args.force)
+        if not ran:
+            print("\n" + "="*60)
+            print("✓ FLASHCARDS AL DÍA (sin cambios desde la última transformación)")
+            print("="*60)
+            return True
+
+        num_topics, num_questions = result
 
         print("\n" + "="*60)
         print("✓ TRANSFORMACIÓN COMPLETADA")
-        print(f"   ✓ {len(topics)} topics de flashcards")
-        print(f"   ✓ {len(questions)} questions de flashcards")
+        print(f"   ✓ {num_topics} topics de flashcards")
+        print(f"   ✓ {num_questions} questions de flashcards")
         print(f"   ✓ Mapeo de stacks guardado")
         print("="*60)
-        print("\n⚠️ NOTA: Los IDs de topics se asignarán en la BD")
-        print("   El mapeo stack_id → topic_id se completará después del INSERT")
 
         return True
 